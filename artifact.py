@@ -0,0 +1,110 @@
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import numpy as np
+
+from recommender import KEY_COLUMNS, LABEL_COLUMNS, PreparedTable, RankIndex
+
+# Compiled, memory-mappable form of the prepared tables:
+#
+#   <root>/CURRENT                      name of the version directory to serve
+#   <root>/<version>/manifest.json      format version, fetch time, data source, worksheet fingerprints, tables, row counts and sizes
+#   <root>/<version>/dictionary.json    string labels per table and column
+#   <root>/<version>/<table>/*.npy      close ranks, column codes and the rank index
+#
+# Readers np.load() the arrays with mmap_mode='r', so every worker process
+# on a host shares the same pages of the page cache.
+# 3: int32 close ranks and the smallest integer type for codes
+ARTIFACT_VERSION = 3
+KEEP_VERSIONS = 2
+
+def _slug(name):
+    return name.replace(' ', '_')
+
+def write_artifact(tables, root, fetched_at=None, fingerprints=None, source=None):
+    """Write prepared tables as a new artifact version under `root` and make it current.
+
+    `fingerprints` (see data_loader.fetch_sheets) are kept in the manifest,
+    with the `source` they came from (e.g. "sheets" or "csv:<folder>"), so
+    the next refresh only downloads worksheets that changed.
+    """
+    fetched_at = time.time() if fetched_at is None else fetched_at
+    version = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{os.getpid()}"
+    version_dir = os.path.join(root, version)
+    os.makedirs(version_dir)
+
+    manifest = {"version": ARTIFACT_VERSION, "fetched_at": fetched_at, "source": source, "fingerprints": fingerprints or {}, "tables": {}}
+    dictionary = {}
+    for name, table in tables.items():
+        table_dir = os.path.join(version_dir, _slug(name))
+        os.makedirs(table_dir)
+
+        np.save(os.path.join(table_dir, "close_rank.npy"), np.asarray(table.close_rank))
+        for column, codes in table.codes.items():
+            np.save(os.path.join(table_dir, f"codes.{_slug(column)}.npy"), np.asarray(codes))
+        index = table.index
+        for part in ["positions", "close_rank", "partition_keys", "starts", "ends"]:
+            np.save(os.path.join(table_dir, f"index.{part}.npy"), np.asarray(getattr(index, part)))
+
+        dictionary[name] = {column: [str(label) for label in labels] for column, labels in table.labels.items()}
+        manifest["tables"][name] = {"dir": _slug(name), "rows": len(table), "bytes": table.memory_usage()}
+
+    with open(os.path.join(version_dir, "dictionary.json"), 'w', encoding='utf-8') as f:
+        json.dump(dictionary, f, ensure_ascii=False)
+    # The manifest goes last: a version directory without one is incomplete
+    with open(os.path.join(version_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Swap the pointer atomically, so readers never see a half-written version
+    tmp_pointer = os.path.join(root, f"CURRENT.{os.getpid()}.tmp")
+    with open(tmp_pointer, 'w') as f:
+        f.write(version)
+    os.replace(tmp_pointer, os.path.join(root, "CURRENT"))
+
+    _remove_old_versions(root, version)
+    return version_dir
+
+def _remove_old_versions(root, current):
+    versions = sorted(
+        entry for entry in os.listdir(root)
+        if os.path.isdir(os.path.join(root, entry)) and entry != current
+    )
+    # Processes may still have older versions mapped; on POSIX removing the files is safe
+    for entry in versions[:max(0, len(versions) - (KEEP_VERSIONS - 1))]:
+        shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+def read_artifact(root):
+    """Memory-map the current artifact under `root`.
+
+    Returns {"fetched_at": ..., "source": ..., "fingerprints": ..., "tables": {name: PreparedTable}}, or None if
+    there is no complete artifact in a format this code understands.
+    """
+    try:
+        with open(os.path.join(root, "CURRENT")) as f:
+            version_dir = os.path.join(root, f.read().strip())
+        with open(os.path.join(version_dir, "manifest.json"), encoding='utf-8') as f:
+            manifest = json.load(f)
+        with open(os.path.join(version_dir, "dictionary.json"), encoding='utf-8') as f:
+            dictionary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != ARTIFACT_VERSION:
+        return None
+
+    def load(table_dir, filename):
+        return np.load(os.path.join(table_dir, filename), mmap_mode='r')
+
+    tables = {}
+    for name, info in manifest["tables"].items():
+        table_dir = os.path.join(version_dir, info["dir"])
+        codes = {column: load(table_dir, f"codes.{_slug(column)}.npy") for column in KEY_COLUMNS + LABEL_COLUMNS}
+        labels = {column: np.array(values, dtype=object) for column, values in dictionary[name].items()}
+        index = RankIndex.from_arrays(*[
+            load(table_dir, f"index.{part}.npy") for part in ["positions", "close_rank", "partition_keys", "starts", "ends"]
+        ])
+        tables[name] = PreparedTable.from_arrays(load(table_dir, "close_rank.npy"), codes, labels, index)
+
+    return {"fetched_at": manifest["fetched_at"], "source": manifest.get("source"), "fingerprints": manifest.get("fingerprints", {}), "tables": tables}
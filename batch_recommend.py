@@ -0,0 +1,37 @@
+import argparse
+
+import pandas as pd
+
+from data_loader import load_dataset
+from recommender import latest_round, recommend_batch
+
+def run_batch(input_path, output_path):
+    """Read student profiles from a CSV file and write all NIT/IIIT recommendations to another CSV"""
+    profiles = pd.read_csv(input_path)
+
+    missing = [c for c in ['gender', 'category', 'state', 'rank', 'degrees', 'branches'] if c not in profiles.columns]
+    if missing:
+        raise ValueError(f"Profiles file is missing columns: {', '.join(missing)}")
+
+    # Use the student's name as the profile label when the file has one
+    if 'name' in profiles.columns:
+        profiles = profiles.set_index('name', drop=False)
+
+    sheets = load_dataset()
+    round_no = latest_round(sheets, ("NIT", "IIIT"))
+    results = recommend_batch(profiles, sheets[f"nits round {round_no}"], sheets[f"iiits round {round_no}"])
+    results.to_csv(output_path, index=False)
+    return profiles, results
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate college recommendations for a whole batch of students.")
+    parser.add_argument("input", help="CSV with columns name (optional), gender, category, state, rank, degrees, branches; "
+                                      "degrees and branches are ', '-separated")
+    parser.add_argument("output", help="CSV to write recommendations to")
+    args = parser.parse_args()
+
+    profiles, results = run_batch(args.input, args.output)
+    print(f"✅ Wrote {len(results)} recommendations for {len(profiles)} students to {args.output}")
+
+if __name__ == "__main__":
+    main()
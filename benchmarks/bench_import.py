@@ -0,0 +1,82 @@
+"""Import-time benchmark for the two entry points.
+
+Measures, in fresh interpreters, how long importing the CLI (chatbot) and
+the modules stream.py needs takes, and which heavy client libraries get
+pulled in. Run from the repository root:
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --baseline HEAD~1   # compare with another revision
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+import numpy as np
+
+# stream.py itself runs the Streamlit app when imported, so time the modules it imports
+ENTRY_POINTS = {
+    "chatbot": "import chatbot",
+    "stream.py imports": "import data_loader, recommender, metrics\ntry:\n    import options\nexcept ImportError:\n    pass",
+}
+HEAVY_MODULES = ["gspread", "oauth2client", "streamlit", "requests"]
+
+def import_profile(code, cwd):
+    """Wall time (ms) of importing `code` in a fresh interpreter, and the heavy modules it loaded"""
+    probe = (
+        "import sys, time\n"
+        "started = time.perf_counter()\n"
+        f"{code}\n"
+        "elapsed = (time.perf_counter() - started) * 1000\n"
+        f"print(elapsed, ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], cwd=cwd, capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=cwd + os.pathsep + os.environ.get("PYTHONPATH", "")))
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed"
+    elapsed, _, heavy = result.stdout.strip().splitlines()[-1].partition(' ')
+    return float(elapsed), heavy or "-"
+
+def measure(cwd, repeat):
+    rows = []
+    for name, code in ENTRY_POINTS.items():
+        times = []
+        heavy = "-"
+        for _ in range(repeat):
+            elapsed, heavy = import_profile(code, cwd)
+            if elapsed is None:
+                break
+            times.append(elapsed)
+        if times:
+            rows.append((name, np.median(times), np.min(times), heavy))
+        else:
+            rows.append((name, float('nan'), float('nan'), f"FAILED: {heavy}"))
+    return rows
+
+def extract_revision(revision, folder):
+    archive = os.path.join(folder, "tree.tar")
+    subprocess.run(["git", "archive", "--format=tar", "-o", archive, revision], check=True)
+    with tarfile.open(archive) as tar:
+        tar.extractall(os.path.join(folder, "tree"))
+    return os.path.join(folder, "tree")
+
+def report(title, rows):
+    print(f"\n{title}")
+    print(f"{'entry point':<20} {'median ms':>10} {'min ms':>10}  heavy modules imported")
+    for name, median, minimum, heavy in rows:
+        print(f"{name:<20} {median:>10.1f} {minimum:>10.1f}  {heavy}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import time of the CLI and Streamlit entry points.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per entry point")
+    parser.add_argument("--baseline", help="Git revision to compare against (e.g. HEAD~1)")
+    args = parser.parse_args()
+
+    report("Working tree", measure(os.getcwd(), args.repeat))
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as folder:
+            report(f"Baseline {args.baseline}", measure(extract_revision(args.baseline, folder), args.repeat))
+
+if __name__ == "__main__":
+    main()
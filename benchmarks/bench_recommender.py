@@ -0,0 +1,147 @@
+"""Benchmarks for the load, filter and save paths on synthetic JoSAA-scale data.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_recommender            # realistic scale
+    python -m benchmarks.bench_recommender --scale 10 # 10x scale
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import chat_log
+import chat_store
+from benchmarks.synthetic import BRANCHES, DEGREES, synthetic_profiles, synthetic_sheets
+from artifact import read_artifact, write_artifact
+from data_loader import save_user_chat_json
+from recommender import filter_colleges, prepare_tables, rank_sweep, recommend
+
+def measure(name, fn, calls, traced_calls=20):
+    """Call fn(*args) for every args in `calls`; return latency percentiles (ms) and peak memory.
+
+    Latency is timed without tracemalloc, which slows allocations down a lot.
+    Peak memory comes from a separate traced run of the first `traced_calls` calls.
+    """
+    latencies = []
+    started = time.perf_counter()
+    for args in calls:
+        t0 = time.perf_counter()
+        fn(*args)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    for args in calls[:traced_calls]:
+        fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = np.array(latencies)
+    return {
+        'case': name,
+        'calls': len(latencies),
+        'p50 ms': np.percentile(latencies, 50),
+        'p90 ms': np.percentile(latencies, 90),
+        'p99 ms': np.percentile(latencies, 99),
+        'max ms': latencies.max(),
+        'ops/s': len(latencies) / elapsed if elapsed else float('inf'),
+        'peak MiB': peak / 2 ** 20,
+    }
+
+def query_mixes(profiles):
+    """Argument lists for filter_colleges per query mix (table is filled in by the caller)"""
+    rows = profiles.to_dict('records')
+    return {
+        'nit single branch + state': [
+            (p['gender'], p['category'], p['rank'], [DEGREES[0]], [p['branches'].split(', ')[0]], p['state'], True) for p in rows
+        ],
+        'nit all branches + state': [
+            (p['gender'], p['category'], p['rank'], DEGREES, BRANCHES, p['state'], True) for p in rows
+        ],
+        'nit profile mix + state': [
+            (p['gender'], p['category'], p['rank'], p['degrees'].split(', '), p['branches'].split(', '), p['state'], True) for p in rows
+        ],
+        'iiit profile mix': [
+            (p['gender'], p['category'], p['rank'], p['degrees'].split(', '), p['branches'].split(', '), None, False) for p in rows
+        ],
+        'iiit all branches': [
+            (p['gender'], p['category'], p['rank'], DEGREES, BRANCHES, None, False) for p in rows
+        ],
+    }
+
+def run(scale=1, queries=500, saves=2000, seed=0):
+    results = []
+    sheets = synthetic_sheets(scale=scale, seed=seed)
+    print(f"Synthetic data at {scale}x: " + ", ".join(f"{name}: {len(df)} rows" for name, df in sheets.items()))
+
+    # --- Load path: preparing tables from cleaned sheets, and mapping them back from a snapshot ---
+    results.append(measure('prepare tables', prepare_tables, [(sheets,)] * 5))
+    tables = prepare_tables(sheets)
+    print("Prepared table sizes: " + ", ".join(f"{name}: {sum(table.memory_usage().values()) / 1024:.0f} KiB" for name, table in tables.items()))
+    with tempfile.TemporaryDirectory() as folder:
+        results.append(measure('snapshot write', write_artifact, [(tables, folder)] * 5))
+        results.append(measure('snapshot read (mmap)', read_artifact, [(folder,)] * 5))
+
+    # --- Filter path ---
+    profiles = synthetic_profiles(queries, seed=seed)
+    for name, calls in query_mixes(profiles).items():
+        table = tables['nits round 5'] if name.startswith('nit') else tables['iiits round 5']
+        results.append(measure(f"filter: {name}", lambda *args: filter_colleges(table, *args[:5], state=args[5], is_nit=args[6]), calls))
+
+    # --- What-if path: one query vs. a 101-rank sweep of the same profile ---
+    combined = tables['all round 5']
+    profile_calls = [
+        (p['gender'], p['category'], p['rank'], p['degrees'].split(', '), p['branches'].split(', '), p['state'])
+        for p in profiles.to_dict('records')
+    ]
+    results.append(measure("recommend: one rank", lambda g, c, r, d, b, s: recommend(combined, g, c, r, d, b, state=s), profile_calls))
+    results.append(measure("recommend: first page of 25", lambda g, c, r, d, b, s: recommend(combined, g, c, r, d, b, state=s, limit=25), profile_calls))
+    results.append(measure(
+        "rank sweep: 101 ranks",
+        lambda g, c, r, d, b, s: rank_sweep(combined, g, c, d, b, state=s).counts(np.linspace(max(1, r - 5000), r + 5000, 101)),
+        profile_calls
+    ))
+
+    # --- Save path ---
+    sample = profiles.iloc[0]
+    nits = filter_colleges(tables['nits round 5'], sample['gender'], sample['category'], sample['rank'], DEGREES, BRANCHES, state=sample['state'], is_nit=True)
+    iiits = filter_colleges(tables['iiits round 5'], sample['gender'], sample['category'], sample['rank'], DEGREES, BRANCHES)
+    user_data = {
+        'name': sample['name'], 'phone': '9999999999', 'gender': sample['gender'], 'category': sample['category'],
+        'state': sample['state'], 'degrees': sample['degrees'], 'branches': sample['branches'], 'rank': int(sample['rank']),
+        'nit_count': len(nits), 'iiit_count': len(iiits),
+    }
+    # Both chat writers: the SQLite store (the default) and JSONL segments (CHAT_STORE=jsonl)
+    for label, make_writer in [
+        ("sqlite", lambda folder: chat_store.ChatStore(os.path.join(folder, "chats.db"))),
+        ("jsonl", lambda folder: chat_log.ChatLogWriter(folder)),
+    ]:
+        with tempfile.TemporaryDirectory() as folder:
+            writer = make_writer(folder)
+            chat_log._writer = writer
+            results.append(measure(f'save_user_chat_json ({label})', save_user_chat_json, [(user_data, nits, iiits)] * saves))
+            results.append(measure(f'chat {label} flush to disk', writer.flush, [()] * 5))
+            writer.close()
+            chat_log._writer = None
+
+    return pd.DataFrame(results).set_index('case')
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the load, filter and save paths on synthetic data.")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply the number of colleges (1 = realistic, 10 = 10x)")
+    parser.add_argument("--queries", type=int, default=500, help="Queries per filter mix")
+    parser.add_argument("--saves", type=int, default=2000, help="Number of chat records to save")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = run(scale=args.scale, queries=args.queries, saves=args.saves, seed=args.seed)
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.float_format', '{:.3f}'.format):
+        print(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Load test of the recommendation path with many concurrent virtual users.
+
+Each virtual user is a thread, as each Streamlit session is, looping over
+think time -> load_dataset() -> recommend() for its exam -> save_user_chat_json().
+Data comes from an in-memory FakeSheetsClient (see fake_sheets.py) with
+Sheets-like latency, through the real snapshot and refresh logic. Run from
+the repository root:
+
+    python -m benchmarks.load_test --users 50 --duration 60
+    python -m benchmarks.load_test --users 200 --ramp 30 --ttl 10 --update-every 15
+
+Every --interval seconds it prints throughput, latency percentiles, error
+rate and process memory; a summary follows at the end.
+"""
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import chat_log
+import chat_store
+import data_loader
+from benchmarks.synthetic import synthetic_profiles, synthetic_sheets
+from fake_sheets import FakeSheetsClient
+from recommender import latest_round, query_cache, recommend
+
+# Share of students asking for JEE Mains (NITs and IIITs) vs JEE Advanced (IITs) suggestions
+EXAM_MIX = {("NIT", "IIIT"): 0.8, ("IIT",): 0.2}
+
+def rss_mib():
+    """Current resident memory of this process (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 2 ** 20 if peak > 2 ** 32 else peak / 1024
+
+def worksheet_frames(scale, seed):
+    """Synthetic sheets under their Google Sheets titles, e.g. 'NITs Round 5'"""
+    titles = {"nits": "NITs", "iiits": "IIITs", "iits": "IITs"}
+    return {
+        f"{titles[name.split(' ')[0]]} Round {name.rsplit(' ', 1)[-1]}": df
+        for name, df in synthetic_sheets(scale=scale, seed=seed).items()
+    }
+
+class Recorder:
+    """Latencies and errors of finished requests, collected per reporting interval"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+        self.error_types = {}
+
+    def record(self, ms, error=None):
+        with self._lock:
+            self.latencies.append(ms)
+            if error is not None:
+                self.errors += 1
+                name = type(error).__name__
+                self.error_types[name] = self.error_types.get(name, 0) + 1
+
+    def drain(self):
+        with self._lock:
+            latencies, errors = self.latencies, self.errors
+            self.latencies, self.errors = [], 0
+            return np.array(latencies), errors
+
+def row(elapsed, users, latencies, errors, seconds, memory):
+    percentiles = np.percentile(latencies, [50, 95, 99]) if len(latencies) else [np.nan] * 3
+    return {
+        't s': elapsed,
+        'users': users,
+        'requests': len(latencies),
+        'req/s': len(latencies) / seconds if seconds else 0.0,
+        'p50 ms': percentiles[0],
+        'p95 ms': percentiles[1],
+        'p99 ms': percentiles[2],
+        'max ms': latencies.max() if len(latencies) else np.nan,
+        'error %': 100.0 * errors / len(latencies) if len(latencies) else 0.0,
+        'rss MiB': memory,
+    }
+
+def virtual_user(user_id, profiles, recorder, stop, think, use_cache, seed):
+    rng = np.random.default_rng(seed)
+    exams = list(EXAM_MIX)
+    weights = np.array(list(EXAM_MIX.values()))
+    while not stop.is_set():
+        if think:
+            # Students pause between requests; exponential think time around the mean
+            if stop.wait(rng.exponential(think)):
+                break
+        profile = profiles[rng.integers(len(profiles))]
+        institutes = exams[rng.choice(len(exams), p=weights / weights.sum())]
+
+        started = time.perf_counter()
+        error = None
+        try:
+            sheets = data_loader.load_dataset()
+            results = recommend(
+                sheets[f"all round {latest_round(sheets, institutes)}"],
+                profile['gender'],
+                profile['category'],
+                profile['rank'],
+                profile['degrees'].split(', '),
+                profile['branches'].split(', '),
+                state=profile['state'],
+                institutes=institutes,
+                debug=False,
+                cache=query_cache if use_cache else None
+            )
+            user_data = {
+                'name': profile['name'], 'phone': f"9{user_id:09d}", 'exam': "JEE Mains" if "NIT" in institutes else "JEE Advanced",
+                'gender': profile['gender'], 'category': profile['category'], 'state': profile['state'],
+                'degrees': profile['degrees'], 'branches': profile['branches'], 'rank': int(profile['rank']),
+                'nit_count': len(results.get("NIT", [])), 'iiit_count': len(results.get("IIIT", [])), 'iit_count': len(results.get("IIT", [])),
+            }
+            data_loader.save_user_chat_json(user_data, results.get("NIT"), results.get("IIIT"), results.get("IIT"))
+        except Exception as e:
+            error = e
+        recorder.record((time.perf_counter() - started) * 1000, error)
+
+def run(users=50, duration=60, ramp=0, think=1.0, interval=5, scale=1, profiles=5000, ttl=600,
+        sheets_latency=0.2, failure_rate=0.0, update_every=0, use_cache=True, seed=0):
+    frames = worksheet_frames(scale, seed)
+    client = FakeSheetsClient.from_frames(frames, latency=sheets_latency, failure_rate=failure_rate, seed=seed)
+    profile_rows = synthetic_profiles(profiles, seed=seed).to_dict('records')
+
+    folder = tempfile.mkdtemp(prefix="load_test_")
+    data_loader.CACHE_DIR = os.path.join(folder, "sheets_cache")
+    data_loader.CACHE_TTL = ttl
+    data_loader.set_sheets_client(client)
+    chat_log._writer = chat_store.ChatStore(os.path.join(folder, "chats.db"))
+
+    recorder = Recorder()
+    stop = threading.Event()
+    threads = []
+    report = []
+    rng = np.random.default_rng(seed)
+    print(f"Load test: {users} users, {duration}s, think {think}s, ramp {ramp}s, TTL {ttl}s, "
+          f"Sheets latency {sheets_latency}s, failure rate {failure_rate}, cache {'on' if use_cache else 'off'}")
+
+    memory_start = rss_mib()
+    started = last_report = last_update = time.time()
+    try:
+        while True:
+            now = time.time()
+            elapsed = now - started
+            if elapsed >= duration:
+                break
+
+            # Ramp users up linearly over `ramp` seconds
+            target = users if not ramp else min(users, int(np.ceil(users * min(1.0, (elapsed + 1e-9) / ramp))))
+            while len(threads) < target:
+                thread = threading.Thread(
+                    target=virtual_user,
+                    args=(len(threads), profile_rows, recorder, stop, think, use_cache, seed + len(threads) + 1),
+                    name=f"vu-{len(threads)}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+            # Publish new close ranks now and then, so refreshes happen under load
+            if update_every and now - last_update >= update_every:
+                title = list(frames)[rng.integers(len(frames))]
+                df = frames[title].assign(**{'close rank': (frames[title]['close rank'] * rng.uniform(0.95, 1.05)).round()})
+                client.set_values(title, [list(df.columns)] + df.astype(str).values.tolist())
+                last_update = now
+
+            if now - last_report >= interval:
+                latencies, errors = recorder.drain()
+                report.append(row(elapsed, len(threads), latencies, errors, now - last_report, rss_mib()))
+                print(" | ".join(f"{k} {v:.1f}" if isinstance(v, float) else f"{k} {v}" for k, v in report[-1].items()))
+                last_report = now
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=30)
+        latencies, errors = recorder.drain()
+        if len(latencies):
+            report.append(row(time.time() - started, len(threads), latencies, errors, time.time() - last_report, rss_mib()))
+        chat_log._writer.close()
+        chat_log._writer = None
+        data_loader.reset_sheets_client()
+        shutil.rmtree(folder, ignore_errors=True)
+
+    report = pd.DataFrame(report)
+    totals = {
+        'requests': int(report['requests'].sum()),
+        'throughput req/s': report['requests'].sum() / duration,
+        'error %': 100.0 * sum(recorder.error_types.values()) / max(1, report['requests'].sum()),
+        'errors by type': recorder.error_types,
+        'rss start MiB': memory_start,
+        'rss end MiB': report['rss MiB'].iloc[-1] if len(report) else memory_start,
+        'sheets calls': dict(client.calls),
+        'query cache': query_cache.stats(),
+    }
+    return report, totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the recommendation path with concurrent virtual users.")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Test length in seconds")
+    parser.add_argument("--ramp", type=float, default=0, help="Seconds over which users are added (0 = all at once)")
+    parser.add_argument("--think", type=float, default=1.0, help="Mean think time between a user's requests, seconds (0 = none)")
+    parser.add_argument("--interval", type=float, default=5, help="Seconds between progress reports")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply the number of colleges (1 = realistic)")
+    parser.add_argument("--profiles", type=int, default=5000, help="Distinct student profiles to draw from")
+    parser.add_argument("--ttl", type=float, default=600, help="Snapshot TTL in seconds (low values exercise background refreshes)")
+    parser.add_argument("--sheets-latency", type=float, default=0.2, help="Seconds per fake Sheets API call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of fake Sheets API calls that fail")
+    parser.add_argument("--update-every", type=float, default=0, help="Publish changed close ranks every N seconds (0 = never)")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every query instead of using the query cache")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report, totals = run(
+        users=args.users, duration=args.duration, ramp=args.ramp, think=args.think, interval=args.interval,
+        scale=args.scale, profiles=args.profiles, ttl=args.ttl, sheets_latency=args.sheets_latency,
+        failure_rate=args.failure_rate, update_every=args.update_every, use_cache=not args.no_cache, seed=args.seed
+    )
+    print()
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.float_format', '{:.1f}'.format):
+        print(report.to_string(index=False))
+    print()
+    for name, value in totals.items():
+        print(f"{name}: {value:.1f}" if isinstance(value, float) else f"{name}: {value}")
+
+if __name__ == "__main__":
+    main()
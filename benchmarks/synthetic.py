@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Rough shape of one JoSAA round: (colleges, programs per college, quotas)
+INSTITUTES = {
+    "nits": (31, 12, ["HS", "OS"]),
+    "iiits": (26, 6, ["AI"]),
+    "iits": (23, 14, ["AI"]),
+}
+
+GENDERS = ["Gender-Neutral", "Female-only (including Supernumerary)"]
+CATEGORIES = ["OPEN", "OPEN (PwD)", "EWS", "EWS (PwD)", "OBC-NCL", "OBC-NCL (PwD)", "SC", "SC (PwD)", "ST", "ST (PwD)"]
+# How much further down the rank list each category/gender closes, relative to OPEN / Gender-Neutral
+CATEGORY_FACTOR = [1.0, 40.0, 0.25, 8.0, 0.35, 12.0, 0.2, 6.0, 0.1, 3.0]
+GENDER_FACTOR = [1.0, 1.4]
+STATES = ["Andhra Pradesh", "Assam", "Bihar", "Chhattisgarh", "Delhi", "Goa", "Gujarat", "Haryana", "Himachal Pradesh",
+          "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh", "Maharashtra", "Manipur", "Meghalaya", "Mizoram",
+          "Nagaland", "Odisha", "Puducherry", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana", "Tripura",
+          "Uttar Pradesh", "Uttarakhand", "West Bengal", "Jammu and Kashmir", "Arunachal Pradesh"]
+DEGREES = ["Bachelor of Technology", "Bachelor and Master of Technology (Dual Degree)", "Integrated Master of Science",
+           "Bachelor of Architecture"]
+DEGREE_WEIGHTS = [0.85, 0.07, 0.05, 0.03]
+BRANCHES = ["Computer Science and Engineering", "Electronics and Communication Engineering", "Electrical Engineering",
+            "Mechanical Engineering", "Civil Engineering", "Chemical Engineering", "Information Technology",
+            "Metallurgical and Materials Engineering", "Mathematics and Computing", "Biotechnology",
+            "Production and Industrial Engineering", "Engineering Physics", "Artificial Intelligence and Data Science",
+            "Electronics and Instrumentation Engineering", "Mining Engineering", "Architecture", "Physics", "Chemistry",
+            "Aerospace Engineering", "Data Science and Engineering"]
+# Institute types that close deeper in the rank list
+INSTITUTE_DEPTH = {"nits": 60000, "iiits": 80000, "iits": 15000}
+
+def synthetic_table(institute, scale=1, seed=0):
+    """A cleaned cutoff table shaped like one load_sheets() result for `institute` ('nits', 'iiits' or 'iits')"""
+    rng = np.random.default_rng(seed)
+    colleges, programs, quotas = INSTITUTES[institute]
+    colleges *= scale
+    depth = INSTITUTE_DEPTH[institute]
+
+    columns = {name: [] for name in ['college name', 'college state', 'degree', 'branch', 'quota', 'category', 'gender', 'open rank', 'close rank']}
+    for college in range(colleges):
+        college_name = f"Synthetic {institute[:-1].upper()} {college + 1}"
+        college_state = STATES[college % len(STATES)]
+        prestige = rng.uniform(0.05, 1.0)
+
+        branch_ids = rng.choice(len(BRANCHES), size=min(programs, len(BRANCHES)), replace=False)
+        for branch_id in branch_ids:
+            degree = DEGREES[rng.choice(len(DEGREES), p=DEGREE_WEIGHTS)]
+            popularity = 1.0 + branch_id / len(BRANCHES)
+            for quota in quotas:
+                quota_factor = 0.8 if quota == "HS" else 1.0
+                for category, category_factor in zip(CATEGORIES, CATEGORY_FACTOR):
+                    for gender, gender_factor in zip(GENDERS, GENDER_FACTOR):
+                        close = depth * prestige * popularity * quota_factor * category_factor * gender_factor / 3
+                        close = max(1, int(close * rng.uniform(0.8, 1.2)))
+                        columns['college name'].append(college_name)
+                        columns['college state'].append(college_state)
+                        columns['degree'].append(degree)
+                        columns['branch'].append(BRANCHES[branch_id])
+                        columns['quota'].append(quota)
+                        columns['category'].append(category)
+                        columns['gender'].append(gender)
+                        columns['open rank'].append(max(1, int(close * rng.uniform(0.3, 0.9))))
+                        columns['close rank'].append(float(close))
+
+    return pd.DataFrame(columns)
+
+def synthetic_sheets(scale=1, round_no=5, seed=0):
+    """Cleaned sheets keyed like load_sheets(): 'nits round 5', 'iiits round 5', 'iits round 5'"""
+    return {
+        f"{institute} round {round_no}": synthetic_table(institute, scale=scale, seed=seed + i)
+        for i, institute in enumerate(INSTITUTES)
+    }
+
+def synthetic_profiles(count, seed=0):
+    """Random student profiles in the shape recommend_batch() takes"""
+    rng = np.random.default_rng(seed)
+    profiles = []
+    for i in range(count):
+        branch_count = int(rng.choice([1, 2, 3, 5, len(BRANCHES)], p=[0.35, 0.25, 0.2, 0.15, 0.05]))
+        profiles.append({
+            'name': f"student {i + 1}",
+            'gender': GENDERS[int(rng.random() < 0.3)],
+            'category': CATEGORIES[rng.choice(len(CATEGORIES), p=[0.4, 0.01, 0.1, 0.01, 0.27, 0.01, 0.12, 0.01, 0.06, 0.01])],
+            'state': STATES[rng.integers(len(STATES))],
+            # JEE Main ranks are heavily skewed towards the long tail
+            'rank': int(rng.lognormal(mean=10.5, sigma=1.0)) + 1,
+            'degrees': ', '.join(DEGREES[:int(rng.integers(1, 3))]),
+            'branches': ', '.join(rng.choice(BRANCHES, size=branch_count, replace=False)),
+        })
+    return pd.DataFrame(profiles)
@@ -0,0 +1,67 @@
+import numpy as np
+
+from options import state_options
+from recommender import available_rounds, normalize, normalizer
+
+# Columns a selection narrows down, in the order of the count cube's axes
+COUNT_COLUMNS = ['institute', 'category', 'gender', 'degree', 'branch']
+
+class OptionCatalog:
+    """Selectable options of one combined round table, with availability counts.
+
+    `counts[institute, category, gender, degree, branch]` (indexed by the
+    table's codes) is the number of rows for that combination, over all
+    quotas and ranks. A selection whose count is 0 can't match at any rank
+    or home state, so it can be answered without touching the table.
+    """
+
+    def __init__(self, table):
+        self.keys = {column: table.keys[column] for column in COUNT_COLUMNS}
+        self.labels = {column: table.labels[column] for column in COUNT_COLUMNS}
+
+        shape = tuple(len(self.labels[column]) for column in COUNT_COLUMNS)
+        if len(table):
+            flat = np.ravel_multi_index([table.codes[column] for column in COUNT_COLUMNS], shape)
+            counts = np.bincount(flat, minlength=int(np.prod(shape)))
+        else:
+            counts = np.zeros(int(np.prod(shape)), dtype=np.int64)
+        self.counts = counts.reshape(shape)
+
+        # Home states: every college state, plus states without a college in the data
+        states = {normalize(label): label for label in state_options}
+        states.update({normalize(label): label for label in table.labels['college state'] if normalize(label)})
+        self.states = sorted(states.values(), key=str.lower)
+
+    def _selector(self, column, values):
+        """Codes on `column`'s axis for the selected values (every code if `values` is None)"""
+        if values is None:
+            return np.arange(len(self.labels[column]))
+        if isinstance(values, str):
+            values = [values]
+        keys = self.keys[column]
+        return np.array(sorted({keys[v] for v in map(normalizer(column), values) if v in keys}), dtype=int)
+
+    def _cube(self, selected):
+        return self.counts[np.ix_(*[self._selector(column, selected.get(column)) for column in COUNT_COLUMNS])]
+
+    def count(self, gender=None, category=None, degrees=None, branches=None, institutes=None):
+        """Number of rows matching a selection; None leaves a column unrestricted"""
+        return int(self._cube({'institute': institutes, 'category': category, 'gender': gender, 'degree': degrees, 'branch': branches}).sum())
+
+    def options(self, column, gender=None, category=None, degrees=None, branches=None, institutes=None):
+        """[(label, count)] for every value of `column`, counted within the other selections, sorted by label"""
+        selected = {'institute': institutes, 'category': category, 'gender': gender, 'degree': degrees, 'branch': branches}
+        selected[column] = None
+        axis = COUNT_COLUMNS.index(column)
+        cube = self._cube(selected)
+        per_value = cube.sum(axis=tuple(a for a in range(cube.ndim) if a != axis))
+        options = [(label, count) for label, count in zip(self.labels[column].tolist(), per_value.tolist()) if normalize(label)]
+        return sorted(options, key=lambda option: option[0].lower())
+
+def build_catalogs(tables):
+    """{round number: OptionCatalog} for every combined 'all round <n>' table in a load_dataset() result"""
+    return {round_no: OptionCatalog(tables[f"all round {round_no}"]) for round_no in available_rounds(tables)}
+
+def with_count(label, count):
+    """Option label with its availability, e.g. 'Civil Engineering (12)'; just the label if `count` is None"""
+    return label if count is None else f"{label} ({count})"
@@ -0,0 +1,154 @@
+import atexit
+import glob
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_FOLDER = "user_data"
+SEGMENT_PATTERN = "chats_*.jsonl"
+
+class ChatLogWriter:
+    """Appends chat records to rotating JSONL segments from a background thread.
+
+    write() only puts the record on a queue, so the request path never
+    touches the disk. The writer thread appends compact one-line records,
+    flushes (and fsyncs) at most every `flush_interval` seconds, and starts
+    a new segment once the current one reaches `max_segment_bytes`.
+    Pending records are flushed when the process exits.
+    """
+
+    def __init__(self, folder=DEFAULT_FOLDER, max_segment_bytes=16 * 1024 * 1024, flush_interval=2.0):
+        self.folder = folder
+        self.max_segment_bytes = max_segment_bytes
+        self.flush_interval = flush_interval
+        self.segment_path = None
+
+        self._queue = queue.Queue()
+        self._file = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="chat-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, record):
+        """Queue a record for writing and return the segment it is expected to land in"""
+        if self._closed:
+            raise RuntimeError("Chat log writer is closed")
+        self._queue.put(record)
+        return self.segment_path or os.path.join(self.folder, SEGMENT_PATTERN)
+
+    def flush(self):
+        """Block until every record queued so far is on disk"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _open_segment(self):
+        os.makedirs(self.folder, exist_ok=True)
+        timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.segment_path = os.path.join(self.folder, f"chats_{timestamp_str}_{os.getpid()}.jsonl")
+        self._file = open(self.segment_path, 'a', encoding='utf-8')
+
+    def _sync(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _run(self):
+        self._open_segment()
+        # When unsynced records must be on disk; None while everything is synced
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+
+            if item is None:
+                self._sync()
+                self._file.close()
+                return
+            if isinstance(item, threading.Event):
+                self._sync()
+                deadline = None
+                item.set()
+                continue
+
+            if item is not False:
+                try:
+                    line = json.dumps(item, ensure_ascii=False, separators=(',', ':'), default=str)
+                except (TypeError, ValueError) as e:
+                    print(f"[DEBUG] Dropping chat record that could not be serialized: {e}")
+                    continue
+                self._file.write(line + "\n")
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+                if self._file.tell() >= self.max_segment_bytes:
+                    self._sync()
+                    self._file.close()
+                    self._open_segment()
+                    deadline = None
+
+            # Sync on time even when records keep arriving faster than flush_interval
+            if deadline is not None and time.monotonic() >= deadline:
+                self._sync()
+                deadline = None
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_chat_writer():
+    """The process-wide chat writer, created on first use.
+
+    Records go to the indexed SQLite store (see chat_store.py) in
+    CHAT_LOG_DIR, or to JSONL segments there with CHAT_STORE=jsonl.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            if _jsonl_store():
+                _writer = ChatLogWriter(os.environ.get("CHAT_LOG_DIR", DEFAULT_FOLDER))
+            else:
+                from chat_store import ChatStore
+                _writer = ChatStore(chat_store_path())
+        return _writer
+
+def _jsonl_store():
+    return os.environ.get("CHAT_STORE", "sqlite").lower() == "jsonl"
+
+def chat_store_path():
+    """Where get_chat_writer() puts chats: user_data/chats.db, or user_data/chats_*.jsonl with CHAT_STORE=jsonl"""
+    folder = os.environ.get("CHAT_LOG_DIR", DEFAULT_FOLDER)
+    return os.path.join(folder, SEGMENT_PATTERN if _jsonl_store() else "chats.db")
+
+def read_chat_records(folder=DEFAULT_FOLDER):
+    """Stream chat records back out of all segments in `folder`, oldest segment first"""
+    for path in sorted(glob.glob(os.path.join(folder, SEGMENT_PATTERN))):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a partly written last line behind
+                    continue
+
+if __name__ == "__main__":
+    # Dump every record as one JSON line, e.g. `python chat_log.py user_data | jq ...`
+    for record in read_chat_records(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FOLDER):
+        print(json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,323 @@
+import argparse
+import atexit
+import csv
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from programs import canonical_key
+
+# Where chat_log.get_chat_writer() puts the store
+DEFAULT_PATH = os.path.join(os.environ.get("CHAT_LOG_DIR", "user_data"), "chats.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chats (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    name TEXT,
+    phone TEXT,
+    exam TEXT COLLATE NOCASE,
+    gender TEXT COLLATE NOCASE,
+    category TEXT COLLATE NOCASE,
+    state TEXT COLLATE NOCASE,
+    rank INTEGER,
+    nit_count INTEGER,
+    iiit_count INTEGER,
+    iit_count INTEGER,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chat_branches (
+    chat_id INTEGER NOT NULL REFERENCES chats(id),
+    branch TEXT NOT NULL,
+    branch_key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chats_timestamp ON chats(timestamp);
+CREATE INDEX IF NOT EXISTS chats_category_state ON chats(category, state, timestamp);
+CREATE INDEX IF NOT EXISTS chats_state ON chats(state, timestamp);
+CREATE INDEX IF NOT EXISTS chats_rank ON chats(rank);
+CREATE INDEX IF NOT EXISTS chat_branches_key ON chat_branches(branch_key, chat_id);
+CREATE INDEX IF NOT EXISTS chat_branches_chat ON chat_branches(chat_id);
+"""
+
+# Attempts to commit a batch while the database is locked, with exponential backoff
+COMMIT_ATTEMPTS = 5
+
+# Columns a report can be grouped by, and the SQL for each
+GROUPS = {
+    'day': "substr(c.timestamp, 1, 10)",
+    'exam': "c.exam",
+    'gender': "c.gender",
+    'category': "c.category",
+    'state': "c.state",
+    'branch': "b.branch_key",
+}
+
+def connect(path=DEFAULT_PATH):
+    """Connection to the chat store at `path`, creating the schema if needed"""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30)
+    # WAL lets reports read while the writer appends; NORMAL sync is durable across app crashes
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+def _insert(connection, record):
+    user = record.get("user_info") or {}
+    recommendations = record.get("recommendations") or {}
+    counts = {key: (recommendations.get(key) or {}).get("count") for key in ("nits", "iiits", "iits")}
+    branches = user.get("branches") or []
+    if isinstance(branches, str):
+        branches = [branch.strip() for branch in branches.split(', ') if branch.strip()]
+
+    cursor = connection.execute(
+        "INSERT INTO chats (timestamp, name, phone, exam, gender, category, state, rank, nit_count, iiit_count, iit_count, record) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            record.get("timestamp") or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            user.get("name"), user.get("phone"), user.get("exam"), user.get("gender"), user.get("category"), user.get("state"),
+            user.get("jee_rank"), counts["nits"], counts["iiits"], counts["iits"],
+            json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str),
+        )
+    )
+    connection.executemany(
+        "INSERT INTO chat_branches (chat_id, branch, branch_key) VALUES (?, ?, ?)",
+        [(cursor.lastrowid, branch, canonical_key(branch)) for branch in dict.fromkeys(branches)]
+    )
+
+class ChatStore:
+    """Writes chat records to an indexed SQLite database from a background thread.
+
+    A drop-in for chat_log.ChatLogWriter: write() only queues the record.
+    The writer thread inserts whatever is queued in one transaction, up to
+    `batch_size` records or `flush_interval` seconds at a time, so requests
+    never wait on the disk. Pending records are written when the process
+    exits. A record that can't be stored (malformed, or rejected by the
+    database) is logged and dropped on its own; `failed` counts them.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, batch_size=500, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # Create the schema up front, so readers can query before the first write
+        connect(path).close()
+        self._queue = queue.Queue()
+        self._closed = False
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="chat-store-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, record):
+        """Queue a record for writing and return the database it will land in"""
+        if self._closed:
+            raise RuntimeError("Chat store is closed")
+        self._queue.put(record)
+        return self.path
+
+    def flush(self):
+        """Block until every record queued so far is committed"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _commit(self, connection, batch):
+        """Insert `batch` in one transaction and empty it; records that couldn't be written yet stay in it"""
+        error = None
+        for attempt in range(COMMIT_ATTEMPTS):
+            if not batch:
+                return
+            try:
+                with connection:
+                    for record in batch:
+                        _insert(connection, record)
+                batch.clear()
+                return
+            except sqlite3.OperationalError as e:
+                # e.g. "database is locked" while another process writes: back off and try again
+                error = e
+                time.sleep(min(2.0, 0.1 * 2 ** attempt))
+            except Exception:
+                # A record that is malformed or the database rejects: write the others one at a time rather than losing the batch
+                self._commit_each(connection, batch)
+        print(f"[DEBUG] Could not write {len(batch)} chat records yet ({error}); retrying with the next batch")
+
+    def _commit_each(self, connection, batch):
+        kept = []
+        for record in batch:
+            try:
+                with connection:
+                    _insert(connection, record)
+            except sqlite3.OperationalError:
+                kept.append(record)
+            except Exception as e:
+                print(f"[DEBUG] Dropping chat record the store can't write: {e!r}")
+                self.failed += 1
+        batch[:] = kept
+
+    def _run(self):
+        connection = connect(self.path)
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+
+            if item is None:
+                self._commit(connection, batch)
+                if batch:
+                    print(f"[DEBUG] Lost {len(batch)} chat records on close")
+                    self.failed += len(batch)
+                connection.close()
+                return
+            if isinstance(item, threading.Event):
+                self._commit(connection, batch)
+                item.set()
+            elif item is not False:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+                self._commit(connection, batch)
+            else:
+                self._commit(connection, batch)
+            # Records left after a failed commit are retried after another flush_interval
+            deadline = time.monotonic() + self.flush_interval if batch else None
+
+def _where(since=None, until=None, exam=None, gender=None, category=None, state=None, branch=None, rank_min=None, rank_max=None):
+    clauses = []
+    params = []
+    for column, value in [("c.exam", exam), ("c.gender", gender), ("c.category", category), ("c.state", state)]:
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        clauses.append("c.timestamp >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("c.timestamp < ?")
+        params.append(until)
+    if rank_min is not None:
+        clauses.append("c.rank >= ?")
+        params.append(rank_min)
+    if rank_max is not None:
+        clauses.append("c.rank <= ?")
+        params.append(rank_max)
+    if branch is not None:
+        # Any spelling of a branch matches (see programs.canonical_key)
+        clauses.append("c.id IN (SELECT chat_id FROM chat_branches WHERE branch_key = ?)")
+        params.append(canonical_key(branch))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+def report(connection, group_by=(), **filters):
+    """[(group values..., number of chats)] matching `filters`, e.g.
+    report(connection, category='OBC-NCL', state='Bihar', branch='CSE', since='2025-06-09')"""
+    for group in group_by:
+        if group not in GROUPS:
+            raise ValueError(f"Unknown group '{group}' (expected one of {', '.join(GROUPS)})")
+    where, params = _where(**filters)
+    join = " JOIN chat_branches b ON b.chat_id = c.id" if 'branch' in group_by else ""
+    columns = [GROUPS[group] for group in group_by]
+    select = ", ".join(columns + ["count(DISTINCT c.id)"])
+    sql = f"SELECT {select} FROM chats c{join}{where}"
+    if columns:
+        sql += f" GROUP BY {', '.join(columns)} ORDER BY count(DISTINCT c.id) DESC"
+    return connection.execute(sql, params).fetchall()
+
+def records(connection, **filters):
+    """Full chat records matching `filters`, oldest first"""
+    where, params = _where(**filters)
+    for (record,) in connection.execute(f"SELECT c.record FROM chats c{where} ORDER BY c.id", params):
+        yield json.loads(record)
+
+def _since(value):
+    """'7d' / '12h' relative to now, or a date / timestamp as stored"""
+    if value and value[-1] in "dh" and value[:-1].isdigit():
+        delta = timedelta(days=int(value[:-1])) if value[-1] == 'd' else timedelta(hours=int(value[:-1]))
+        return (datetime.now() - delta).strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+def main():
+    parser = argparse.ArgumentParser(description="Query, export and import the SQLite chat store.")
+    parser.add_argument("--db", default=DEFAULT_PATH, help=f"Chat store database (default: {DEFAULT_PATH})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command, description in [("report", "Count chats, optionally grouped"), ("export", "Write matching records as JSON lines or CSV")]:
+        sub = subparsers.add_parser(command, help=description)
+        sub.add_argument("--since", help="e.g. 7d, 12h or 2025-06-14")
+        sub.add_argument("--until")
+        sub.add_argument("--exam")
+        sub.add_argument("--gender")
+        sub.add_argument("--category")
+        sub.add_argument("--state")
+        sub.add_argument("--branch", help="Any spelling, e.g. CSE")
+        sub.add_argument("--rank-min", type=int)
+        sub.add_argument("--rank-max", type=int)
+        if command == "report":
+            sub.add_argument("--by", default="", help=f"Comma-separated groups: {', '.join(GROUPS)}")
+        else:
+            sub.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    migrate = subparsers.add_parser("import", help="Load records from JSONL chat log segments (see chat_log.py)")
+    migrate.add_argument("folder")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        from chat_log import read_chat_records
+        store = ChatStore(args.db)
+        count = 0
+        for record in read_chat_records(args.folder):
+            store.write(record)
+            count += 1
+        store.close()
+        print(f"Imported {count - store.failed} records into {args.db}, {store.failed} failed")
+        return
+
+    connection = connect(args.db)
+    filters = dict(
+        since=_since(args.since), until=_since(args.until), exam=args.exam, gender=args.gender, category=args.category,
+        state=args.state, branch=args.branch, rank_min=args.rank_min, rank_max=args.rank_max,
+    )
+    started = time.perf_counter()
+    if args.command == "report":
+        group_by = [group.strip() for group in args.by.split(",") if group.strip()]
+        rows = report(connection, group_by, **filters)
+        for row in rows:
+            print("\t".join(str(value) for value in row))
+        print(f"({len(rows)} rows in {(time.perf_counter() - started) * 1000:.1f} ms)", file=sys.stderr)
+    elif args.format == "csv":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["timestamp", "name", "phone", "exam", "gender", "category", "state", "rank", "degrees", "branches", "nit_count", "iiit_count", "iit_count"])
+        for record in records(connection, **filters):
+            user = record.get("user_info") or {}
+            counts = {key: (value or {}).get("count") for key, value in (record.get("recommendations") or {}).items()}
+            writer.writerow([
+                record.get("timestamp"), user.get("name"), user.get("phone"), user.get("exam"), user.get("gender"),
+                user.get("category"), user.get("state"), user.get("jee_rank"), ", ".join(user.get("degrees") or []),
+                ", ".join(user.get("branches") or []), counts.get("nits"), counts.get("iiits"), counts.get("iits"),
+            ])
+    else:
+        for record in records(connection, **filters):
+            print(json.dumps(record, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,41 @@
-from data_loader import load_sheets, save_user_data
-from recommender import filter_colleges
+import time
+
+from catalog import with_count
+from data_loader import load_catalogs, load_dataset, save_user_chat_json
+from recommender import latest_round, query_cache, recommend
+import metrics
+from options import exam_institutes
+
+# Result rows printed per page
+PAGE_SIZE = 20
+
+def print_paged(page, fetch_page):
+    """Print results one page at a time, asking before each further page.
+
+    `page` is the first page (with attrs['total'], as recommend() pages
+    them) and fetch_page(offset) returns later ones, so only the rows shown
+    are formatted. Returns the milliseconds spent fetching and printing,
+    not counting the wait for the user.
+    """
+    offset = 0
+    spent = 0.0
+    while True:
+        started = time.perf_counter()
+        if offset:
+            page = fetch_page(offset)
+        print(page.to_string(index=False))
+        shown = offset + len(page)
+        total = page.attrs['total']
+        spent += (time.perf_counter() - started) * 1000
+        if shown >= total or page.empty:
+            return spent
+        try:
+            more = input(f"-- {shown} of {total} shown. Press Enter for more, or q to skip: ")
+        except EOFError:
+            return spent
+        if more.strip().lower() == 'q':
+            return spent
+        offset = shown
 
 def run_bot():
     print("👋 Hello! I can recommend colleges based on your JEE rank.")
@@ -9,120 +45,25 @@ def run_bot():
     
     mode = input("Enter 1 or 2: ").strip()
 
-    if mode != "1":
-        print("Currently, only JEE Mains-based recommendations are supported.")
+    if mode not in ("1", "2"):
+        print("Invalid choice. Please restart.")
         return
 
-    # --- Hardcoded Options ---
-    gender_options = ["Gender-Neutral", "Female-only (including Supernumerary)"]
-    category_options = ["SC", "ST", "EWS", "EWS (PwD)", "OBC-NCL", "OBC-NCL (PwD)", "OPEN", "OPEN (PwD)", "SC (PwD)", "ST (PwD)"]
-    state_options = ["Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh", "Delhi", "Goa", "Gujarat", "Haryana", "Himachal Pradesh", "Jammu and Kashmir", "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh", "Manipur", "Meghalaya", "Mizoram", "Maharashtra", "Nagaland", "Odisha", "Puducherry", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana", "Tripura", "Uttar Pradesh", "Uttarakhand", "West Bengal"]
-
-    degree_options = [
-        "Bachelor of Technology",
-        "Bachelor and Master of Technology (Dual Degree)",
-        "Integrated Master of Science",
-        "Integrated B. Tech. and M. Tech",
-        "Bachelor of Architecture",
-        "Bachelor of Planning",
-        "Bachelor of Science and Master of Science (Dual Degree)",
-        "B.Tech. + M.Tech./MS (Dual Degree)",
-    ]
-
-    branch_options = [
-        "Artificial Intelligence",
-        "Aerospace Engineering",
-        "Architecture",
-        "Architecture and Planning",
-        "Artificial Intelligence and Data Engineering",
-        "Artificial Intelligence and Data Science",
-        "Artificial Intelligence and Machine Learning",
-        "B.Tech in Mathematics and Computing",
-        "B.Tech in Mechanical Engineering and M.Tech in AI and Robotics",
-        "B.Tech. in Electronics and Communication Engineering and M.Tech. in Communication Systems",
-        "B.Tech. in Electronics and Communication Engineering and M.Tech. in VLSI Design",
-        "Bio Medical Engineering",
-        "Bio Technology",
-        "Biotechnology",
-        "Biotechnology and Biochemical Engineering",
-        "Civil Engineering",
-        "Ceramic Engineering",
-        "Ceramic Engineering and M.Tech Industrial Ceramic",
-        "Chemical Engineering",
-        "Chemical Technology",
-        "Chemistry",
-        "Civil Engineering with Specialization in Construction Technology and Management",
-        "Computational and Data Science",
-        "Computational Mathematics",
-        "Computer Science",
-        "Computer Science and Artificial Intelligence",
-        "Computer Science and Business",
-        "Computer Science and Engineering",
-        "Computer Science and Engineering (Artificial Intelligence)",
-        "Computer Science Engineering (Artificial lntelligence and Machine Learning)",
-        "Computer Science Engineering (Data Science and Analytics)",
-        "Computer Science and Engineering (Cyber Physical System)",
-        "Computer Science and Engineering (Cyber Security)",
-        "Computer Science and Engineering (Data Science)",
-        "Computer Science and Engineering (with Specialization of Data Science and Artificial Intelligence)",
-        "Computer Science Engineering (Human Computer lnteraction and Gaming Technology)",
-        "CSE ( Data Science & Analytics)",
-        "Data Science and Engineering",
-        "Data Science and Artificial Intelligence",
-        "Electronics and Communication Engineering",
-        "Electrical and Electronics Engineering",
-        "Electrical Engineering",
-        "Electrical Engineering with Specialization In Power System Engineering",
-        "Electronics and Communication Engineering (Internet of Things)",
-        "Electronics and Communication Engineering (with Specialization of Embedded Systems and Internet of Things)",
-        "Electronics and Communication Engineering with specialization in Design and Manufacturing",
-        "Electronics and Communication Engineering (VLSI Design and Technology)",
-        "Electronics and Communication Engineering with Specialization in Microelectronics and VLSI System Design",
-        "Electronics and Communication Engineering with specialization in VLSI and Embedded Systems",
-        "Electronics and Instrumentation Engineering",
-        "Electronics and Telecommunication Engineering",
-        "Electronics and VLSI Engineering",
-        "Engineering and Computational Mechanics",
-        "Engineering Physics",
-        "Food Process Engineering",
-        "Industrial and Production Engineering",
-        "Information Technology-Business Informatics",
-        "Integrated B. Tech.(IT) and M. Tech (IT)",
-        "Integrated B. Tech.(IT) and MBA",
-        "Industrial Chemistry",
-        "Industrial Design",
-        "Industrial Internet of Things",
-        "Information Technology",
-        "Instrumentation and Control Engineering",
-        "Life Science",
-        "Material Science and Engineering",
-        "Materials Engineering",
-        "Materials Science and Engineering",
-        "Materials Science and Metallurgical Engineering",
-        "Mathematics",
-        "Mathematics & Computing",
-        "Mathematics and Computing",
-        "Mathematics and Computing Technology",
-        "Mathematics and Scientific Computing",
-        "Mathematics and Data Science",
-        "Mechanical Engineering",
-        "Mechanical Engineering with Specialization in Manufacturing and Industrial Engineering",
-        "Mechanical Engineering with specialization in Design and Manufacturing",
-        "Mechatronics and Automation Engineering",
-        "Metallurgical and Materials Engineering",
-        "Metallurgy and Materials Engineering",
-        "Microelectronics & VLSI Engineering",
-        "Mining Engineering",
-        "Physics",
-        "Planning",
-        "Production and Industrial Engineering",
-        "Production Engineering",
-        "ROBOTICS & AUTOMATION",
-        "SUSTAINABLE ENERGY TECHNOLOGIES",
-        "Smart Manufacturing",
-        "Textile Technology",
-        "VLSI Design and Technology"
-    ]
+    # JEE Mains ranks are used for NITs and IIITs, JEE Advanced ranks for IITs
+    exam = "JEE Mains" if mode == "1" else "JEE Advanced"
+    institutes = exam_institutes[exam]
+
+    # Options and their availability come from the data, so load it before asking
+    print("\n📥 Loading college data...")
+    metrics.incr("chatbot.requests")
+    try:
+        with metrics.timed("chatbot.load_dataset"):
+            sheets = load_dataset()
+            round_no = latest_round(sheets, institutes)
+            catalog = load_catalogs()[round_no]
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        return
 
     # --- User Personal Information ---
     print("\n--- Personal Information ---")
@@ -130,19 +71,23 @@ def run_bot():
     phone = input("Enter your Phone Number: ").strip()
 
     # --- User Inputs ---
+    genders = dict(catalog.options('gender', institutes=institutes))
+    gender_options = list(genders)
     print("\nSelect your Gender:")
     for i, g in enumerate(gender_options, 1):
-        print(f"{i}. {g}")
+        print(f"{i}. {with_count(g, genders[g])}")
     try:
-        gender_choice = int(input("Enter choice (1 or 2): "))
+        gender_choice = int(input(f"Enter choice (1 to {len(gender_options)}): "))
         gender = gender_options[gender_choice - 1]
     except (ValueError, IndexError):
         print("Invalid choice. Please restart.")
         return
 
+    categories = dict(catalog.options('category', gender=gender, institutes=institutes))
+    category_options = list(categories)
     print("\nSelect your Category:")
     for i, c in enumerate(category_options, 1):
-        print(f"{i}. {c}")
+        print(f"{i}. {with_count(c, categories[c])}")
     try:
         category_choice = int(input(f"Enter choice (1 to {len(category_options)}): "))
         category = category_options[category_choice - 1]
@@ -150,6 +95,7 @@ def run_bot():
         print("Invalid choice. Please restart.")
         return
 
+    state_options = catalog.states
     print("\nSelect your Home State:")
     for i, s in enumerate(state_options, 1):
         print(f"{i}. {s}")
@@ -160,9 +106,15 @@ def run_bot():
         print("Invalid choice. Please restart.")
         return
 
+    # Only degrees and branches offered for the selections so far; the rest could never match
+    degree_counts = {d: n for d, n in catalog.options('degree', gender=gender, category=category, institutes=institutes) if n}
+    degree_options = list(degree_counts)
+    if not degree_options:
+        print(f"\nNo programs are offered for {gender} / {category} in this round.")
+        return
     print("\nSelect one or more Degrees (comma-separated index):")
     for i, d in enumerate(degree_options, 1):
-        print(f"{i}. {d}")
+        print(f"{i}. {with_count(d, degree_counts[d])}")
     try:
         degree_indices = input("Enter choices (e.g. 1,3): ").split(",")
         degrees = [degree_options[int(i.strip()) - 1] for i in degree_indices]
@@ -170,9 +122,11 @@ def run_bot():
         print("Invalid degree selection. Please restart.")
         return
 
+    branch_counts = {b: n for b, n in catalog.options('branch', gender=gender, category=category, degrees=degrees, institutes=institutes) if n}
+    branch_options = list(branch_counts)
     print("\nSelect one or more Branches (comma-separated index):")
     for i, b in enumerate(branch_options, 1):
-        print(f"{i}. {b}")
+        print(f"{i}. {with_count(b, branch_counts[b])}")
     try:
         branch_indices = input("Enter choices (e.g. 1,4): ").split(",")
         branches = [branch_options[int(i.strip()) - 1] for i in branch_indices]
@@ -181,75 +135,75 @@ def run_bot():
         return
 
     try:
-        rank = int(input("\nEnter your JEE Mains rank: "))
+        rank = int(input(f"\nEnter your {exam} rank: "))
     except ValueError:
         print("Invalid rank. Please enter a valid number.")
         return
 
-    print("\n📥 Loading college data...")
-    try:
-        sheets = load_sheets()
-    except Exception as e:
-        print(f"Error loading data: {e}")
-        return
-
     print("\n🔍 Filtering colleges based on your preferences...")
     
-    # Filter NITs
-    nits_df = filter_colleges(
-        sheets["nits round 5"], 
-        gender, 
-        category, 
-        rank, 
-        degrees, 
-        branches, 
-        state=state, 
-        is_nit=True
-    )
-
-    # Filter IIITs
-    iiits_df = filter_colleges(
-        sheets["iiits round 5"], 
-        gender, 
-        category, 
-        rank, 
-        degrees, 
-        branches
-    )
-
-    print("\n🎯 College Recommendations Based on JEE Mains Rank:\n")
-
-    print("🟢 NITs ===")
-    if nits_df.empty:
-        print("No NITs found matching your criteria.")
-    else:
-        print(nits_df.to_string(index=False))
-
-    print("\n🟣 IIITs ===")
-    if iiits_df.empty:
-        print("No IIITs found matching your criteria.")
-    else:
-        print(iiits_df.to_string(index=False))
-
-    # Save user data to Google Sheets
+    table = sheets[f"all round {round_no}"]
+
+    def results_page(institute_types, limit=PAGE_SIZE, offset=0):
+        # Memoized per profile (see QueryCache), so later pages are slices of the first lookup
+        return recommend(
+            table,
+            gender,
+            category,
+            rank,
+            degrees,
+            branches,
+            state=state,
+            institutes=institute_types,
+            catalog=catalog,
+            limit=limit,
+            offset=offset,
+            cache=query_cache
+        )
+
+    # NITs (with the home state quota rule), IIITs and IITs in one pass
+    with metrics.timed("chatbot.filter"):
+        first_pages = results_page(institutes)
+
+    render_ms = 0.0
+    print(f"\n🎯 College Recommendations Based on {exam} Rank:\n")
+
+    for institute, heading in [("NIT", "🟢 NITs"), ("IIIT", "🟣 IIITs"), ("IIT", "🔵 IITs")]:
+        if institute not in first_pages:
+            continue
+        print(f"\n{heading} ===")
+        if first_pages[institute].empty:
+            print(f"No {institute}s found matching your criteria.")
+        else:
+            render_ms += print_paged(first_pages[institute], lambda offset: results_page(institutes, offset=offset)[institute])
+    metrics.observe("chatbot.render", render_ms)
+
+    # The chat record keeps every matching college, not just the pages shown
+    results = results_page(institutes, limit=None)
+
+    # Save complete chat to the local chat log
     user_data = {
         'name': name,
         'phone': phone,
+        'exam': exam,
         'gender': gender,
         'category': category,
         'state': state,
         'degrees': ', '.join(degrees),
         'branches': ', '.join(branches),
         'rank': rank,
-        'nit_count': len(nits_df),
-        'iiit_count': len(iiits_df)
+        'nit_count': len(results.get("NIT", [])),
+        'iiit_count': len(results.get("IIIT", [])),
+        'iit_count': len(results.get("IIT", []))
     }
     
     try:
-        save_user_data(user_data)
+        with metrics.timed("chatbot.save_chat"):
+            save_user_chat_json(user_data, results.get("NIT"), results.get("IIIT"), results.get("IIT"))
         print("\n✅ Your preferences have been saved successfully!")
     except Exception as e:
         print(f"\n⚠️ Could not save data: {e}")
 
 if __name__ == "__main__":
+    metrics.start_exporters()
     run_bot()
\ No newline at end of file
@@ -1,57 +1,431 @@
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
-import streamlit as st
 from datetime import datetime
 import json
 import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-def load_sheets():
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(st.secrets["gcp_service_account"], scope)
+# gspread, oauth2client, requests and streamlit are imported only when a
+# network fetch actually happens; serving from the local snapshot never needs them.
+import metrics
+from artifact import read_artifact, write_artifact
+from catalog import build_catalogs
+from chat_log import get_chat_writer
+from josaa_schedule import SCHEDULE_FILE, RefreshSchedule, RefreshScheduler
+from recommender import complete_rounds, institute_type, prepare_tables, query_cache
+from sources import ROUND_SHEET, clean_columns, clean_frame, parse_source, values_hash
 
-    client = gspread.authorize(creds)
+# Where the round tables come from: the Google Sheet, or a local source (see sources.py)
+DATA_SOURCE = os.environ.get("DATA_SOURCE", "sheets")
+# Local snapshot of the prepared sheets (see artifact.py), so requests don't wait on the Sheets API
+CACHE_DIR = os.environ.get("SHEETS_CACHE_DIR", "sheets_cache")
+CACHE_TTL = int(os.environ.get("SHEETS_CACHE_TTL", "600"))  # seconds
+# JoSAA schedule that times refreshes once an app calls start_refresh_scheduler (see josaa_schedule.py); empty turns it off
+REFRESH_SCHEDULE = os.environ.get("REFRESH_SCHEDULE", SCHEDULE_FILE)
 
-    sheet_url = "https://docs.google.com/spreadsheets/d/1LW-TpBjX1mK1JT-kraWZ5g5D6ERD_PszqG6qucVYE3s/edit"
-    spreadsheet = client.open_by_url(sheet_url)
-    sheet_names = ["NITs Round 5", "IIITs Round 5", "IITs Round 5"]
+SECRETS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+SHEET_URL = "https://docs.google.com/spreadsheets/d/1LW-TpBjX1mK1JT-kraWZ5g5D6ERD_PszqG6qucVYE3s/edit"
+# Worksheets downloaded in parallel; the Sheets API allows a few concurrent reads per user
+FETCH_WORKERS = int(os.environ.get("SHEETS_FETCH_WORKERS", "4"))
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 1.0  # seconds, doubled on every attempt
+RETRY_MAX_DELAY = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# The snapshot currently served, shared read-only by every session in this process
+_shared_snapshot = None
+# Held while fetching, so concurrent callers wait for one fetch instead of starting their own
+_refresh_lock = threading.Lock()
+_background_lock = threading.Lock()
+_refresh_thread = None
+# RefreshSchedule that sets the TTL (CACHE_TTL when None), and the scheduler refreshing on it
+_refresh_schedule = None
+_scheduler = None
+_scheduler_lock = threading.Lock()
+# Authorized Sheets client, reused across fetches
+_client = None
+_client_lock = threading.Lock()
+
+# Size and hit rate of the recommender's result memo, to size RECOMMENDER_CACHE_SIZE
+metrics.gauge("query_cache", query_cache.stats)
+
+def _changed_worksheets(spreadsheet, worksheets, known):
+    """Names of the worksheets whose fingerprint differs from `known`.
+
+    A fingerprint is the worksheet's grid size plus a hash of all its cell
+    values, so a correction in any column (not just close ranks) is picked
+    up. The values of all known worksheets are fetched in a single batch
+    request, so checking for changes costs one request no matter how many
+    rounds there are; only changed worksheets are cleaned and prepared again.
+    """
+    changed = set()
+    probes = []
+    for worksheet in worksheets:
+        previous = known.get(worksheet.title.lower()) or {}
+        # Fingerprints from an older format or another source never match
+        if (previous.get("rows"), previous.get("cols")) != (worksheet.row_count, worksheet.col_count) or "hash" not in previous:
+            changed.add(worksheet.title.lower())
+        else:
+            probes.append((worksheet, previous))
+
+    if probes:
+        with metrics.timed("sheets.probe"):
+            ranges = [f"'{worksheet.title}'" for worksheet, previous in probes]
+            value_ranges = _with_retries(spreadsheet.values_batch_get, ranges).get('valueRanges', [])
+        for (worksheet, previous), value_range in zip(probes, value_ranges):
+            if values_hash(value_range.get('values', [])) != previous["hash"]:
+                changed.add(worksheet.title.lower())
+
+    return changed
+
+def _is_transient(error):
+    """Whether a Sheets API failure is worth retrying (rate limits, server errors, network hiccups)"""
+    import requests
+
+    if isinstance(error, (ConnectionError, TimeoutError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    status = getattr(error, 'code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    return status in RETRY_STATUSES
+
+def _with_retries(fn, *args):
+    """Call fn(*args), retrying transient failures with exponential backoff and jitter"""
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == RETRY_ATTEMPTS - 1 or not _is_transient(e):
+                raise
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) * random.uniform(0.5, 1.0)
+            metrics.incr("sheets.retries")
+            print(f"[DEBUG] Sheets API call failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def _service_account_info():
+    """Service account credentials, from GCP_SERVICE_ACCOUNT_FILE, Streamlit secrets or .streamlit/secrets.toml"""
+    key_file = os.environ.get("GCP_SERVICE_ACCOUNT_FILE")
+    if key_file:
+        with open(key_file, encoding='utf-8') as f:
+            return json.load(f)
+
+    # Inside the Streamlit app streamlit is already imported, so use its secrets
+    if "streamlit" in sys.modules:
+        return dict(sys.modules["streamlit"].secrets["gcp_service_account"])
+
+    # The CLI reads the same secrets file directly, without importing streamlit
+    import tomllib
+    with open(SECRETS_FILE, 'rb') as f:
+        return tomllib.load(f)["gcp_service_account"]
+
+def get_sheets_client():
+    """The authorized Sheets client, created once and reused across fetches"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            fake_dir = os.environ.get("SHEETS_FAKE_DIR")
+            if fake_dir:
+                # Offline stand-in serving CSV files (see fake_sheets.py), optionally with Sheets-like latency per call
+                from fake_sheets import FakeSheetsClient
+                _client = FakeSheetsClient.from_csv_dir(fake_dir, latency=float(os.environ.get("SHEETS_FAKE_LATENCY", "0")))
+            else:
+                import gspread
+                from oauth2client.service_account import ServiceAccountCredentials
+
+                scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+                with metrics.timed("sheets.auth"):
+                    creds = ServiceAccountCredentials.from_json_keyfile_dict(_service_account_info(), scope)
+                    _client = gspread.authorize(creds)
+        return _client
+
+def set_sheets_client(client):
+    """Use `client` (e.g. a fake_sheets.FakeSheetsClient) for all further fetches"""
+    global _client
+    with _client_lock:
+        _client = client
+
+def reset_sheets_client():
+    """Drop the pooled client, so the next fetch authorizes again"""
+    set_sheets_client(None)
+
+def _fetch_worksheet(worksheet):
+    """(cleaned DataFrame, fingerprint) of a round worksheet, or None if it has no close ranks yet"""
+    with metrics.timed("sheets.fetch_worksheet"):
+        values = _with_retries(worksheet.get_all_values)
+    header = clean_columns(values[0] if values else [])
+    if 'close rank' not in header:
+        # A round tab created ahead of time but not filled in yet
+        print(f"[DEBUG] Skipping '{worksheet.title}': no close rank column")
+        metrics.incr("sheets.worksheets_skipped")
+        return None
+    df = clean_frame(pd.DataFrame(values[1:], columns=header))
+    if df.empty:
+        # Only the header has been filled in so far
+        print(f"[DEBUG] Skipping '{worksheet.title}': no rows with a close rank")
+        metrics.incr("sheets.worksheets_skipped")
+        return None
+
+    print(f"[DEBUG] Cleaned Columns in '{worksheet.title}':", df.columns.tolist())
+
+    fingerprint = {
+        "rows": worksheet.row_count,
+        "cols": worksheet.col_count,
+        "hash": values_hash(values),
+    }
+    return df, fingerprint
+
+def fetch_sheets(known=None):
+    """Fetch and clean the round worksheets straight from Google Sheets (no cache).
+
+    Every worksheet titled "<NITs|IIITs|IITs> Round <n>" is discovered.
+    `known` maps sheet names to the fingerprints returned by an earlier
+    call; worksheets whose fingerprint is unchanged are not downloaded again.
+    Changed worksheets are downloaded concurrently (FETCH_WORKERS at a time),
+    and every API call is retried on rate limits and transient errors.
+
+    Returns (data, fingerprints): cleaned DataFrames of the downloaded
+    worksheets keyed by lowercased title, and fingerprints of all round
+    worksheets currently in the spreadsheet. Round worksheets without a
+    close rank column or without any rows (tabs not filled in yet) are left out of both.
+    """
+    known = known or {}
+    client = get_sheets_client()
+
+    with metrics.timed("sheets.open"):
+        spreadsheet = _with_retries(client.open_by_url, SHEET_URL)
+        worksheets = [ws for ws in _with_retries(spreadsheet.worksheets) if ROUND_SHEET.match(ws.title.strip())]
+
+    changed = _changed_worksheets(spreadsheet, worksheets, known)
+    metrics.incr("sheets.worksheets_unchanged", len(worksheets) - len(changed))
+
+    to_fetch = [ws for ws in worksheets if ws.title.lower() in changed]
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="sheets-fetch") as pool:
+        fetched = dict(zip([ws.title.lower() for ws in to_fetch], pool.map(_fetch_worksheet, to_fetch)))
 
     data = {}
-    for name in sheet_names:
-        worksheet = spreadsheet.worksheet(name)
-        df = pd.DataFrame(worksheet.get_all_records())
+    fingerprints = {}
+    for worksheet in worksheets:
+        name = worksheet.title.lower()
+        if name not in fetched:
+            fingerprints[name] = known[name]
+        elif fetched[name] is not None:
+            data[name], fingerprints[name] = fetched[name]
+
+    return data, fingerprints
+
+class SheetsSource:
+    """The Google Sheet at SHEET_URL (or its SHEETS_FAKE_DIR stand-in), fetched with fetch_sheets()"""
+
+    def __repr__(self):
+        return "sheets"
+
+    def fetch(self, known=None):
+        return fetch_sheets(known)
+
+_source = None
+
+def get_data_source():
+    """The source snapshots are built from: set_data_source()'s, else the one DATA_SOURCE names"""
+    if _source is not None:
+        return _source
+    return parse_source(DATA_SOURCE) or SheetsSource()
 
-        # Clean column names
-        df.columns = (
-            df.columns
-            .str.encode('ascii', 'ignore').str.decode('ascii')
-            .str.strip()
-            .str.lower()
-            .str.replace(r'\s+', ' ', regex=True)
-        )
+def set_data_source(source):
+    """Build snapshots from `source` (anything with fetch(known) -> (data, fingerprints)); None restores DATA_SOURCE"""
+    global _source
+    _source = source
 
-        # Clean "close rank"
-        df['close rank'] = pd.to_numeric(df['close rank'], errors='coerce')
+def _read_snapshot():
+    with metrics.timed("snapshot.read"):
+        return read_artifact(CACHE_DIR)
 
-        print(f"[DEBUG] Cleaned Columns in '{name}':", df.columns.tolist())
-        data[name.lower()] = df.dropna(subset=['close rank'])
+def _write_snapshot(previous=None):
+    """Fetch round tables that changed since `previous`, and write a snapshot of all of them"""
+    source = get_data_source()
+    # Fingerprints only mean something to the source that made them
+    if previous and previous.get("source") != repr(source):
+        previous = None
+    previous_tables = previous["tables"] if previous else {}
+    data, fingerprints = source.fetch(previous["fingerprints"] if previous else None)
 
-    return data
+    # Unchanged worksheets keep their prepared table; only changed ones are prepared again
+    reuse = {name: previous_tables[name] for name in fingerprints if name not in data}
+    sheets = {name: data[name] if name in data else reuse[name].frame for name in fingerprints}
 
-def save_user_chat_json(user_data, nits_results, iiits_results):
-    """Save complete user chat data to JSON file in project folder"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    write_artifact(prepare_tables(sheets, reuse=reuse), CACHE_DIR, fingerprints=fingerprints, source=repr(source))
+    # Serve the memory-mapped copy, so all workers on this host share its pages
+    return _read_snapshot()
+
+def _share(snapshot):
+    global _shared_snapshot
+    for table in snapshot["tables"].values():
+        table.freeze()
+    # Option catalogs follow the data, so they are rebuilt once per refresh
+    snapshot["catalogs"] = build_catalogs(snapshot["tables"])
+    _shared_snapshot = snapshot
+    # Memoized results belong to the previous tables
+    query_cache.clear()
+    return snapshot
+
+def refresh_snapshot():
+    """Fetch fresh data from the data source and overwrite the local snapshot"""
+    started = time.time()
+    with _refresh_lock:
+        # Someone else finished a refresh while we were waiting for the lock
+        if _shared_snapshot is not None and _shared_snapshot["fetched_at"] >= started:
+            return _shared_snapshot
+        metrics.incr("sheets.refreshes")
+        with metrics.timed("sheets.refresh"):
+            return _share(_write_snapshot(_shared_snapshot or _read_snapshot()))
+
+def _current_snapshot():
+    if _shared_snapshot is not None:
+        return _shared_snapshot
+
+    with _refresh_lock:
+        if _shared_snapshot is None:
+            snapshot = _read_snapshot()
+            _share(snapshot if snapshot is not None else _write_snapshot())
+        return _shared_snapshot
+
+def _refresh_in_background(ttl):
+    global _refresh_thread
+
+    def run():
+        try:
+            # Another worker process on this host may already have refreshed the file
+            snapshot = _read_snapshot()
+            if snapshot is not None and time.time() - snapshot["fetched_at"] <= ttl:
+                with _refresh_lock:
+                    _share(snapshot)
+            else:
+                refresh_snapshot()
+        except Exception as e:
+            print(f"[DEBUG] Background refresh of sheets failed: {e}")
+
+    with _background_lock:
+        # Only one background refresh at a time
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return
+        _refresh_thread = threading.Thread(target=run, name="sheets-refresh", daemon=True)
+        _refresh_thread.start()
+
+def load_dataset(ttl=None):
+    """Load prepared tables (see recommender.PreparedTable), serving from the local snapshot when possible.
+
+    The tables are loaded once per process and shared by all callers, so
+    they must be treated as read-only. Within `ttl` seconds (default
+    CACHE_TTL, or the refresh schedule's TTL when one is in use) they are
+    returned as-is. Once stale they are still returned,
+    and a refresh runs in the background. Only a cold start makes the caller
+    wait, and concurrent cold callers share a single fetch.
+    """
+    ttl = _default_ttl() if ttl is None else ttl
+    if _shared_snapshot is None:
+        metrics.incr("dataset.cache.miss")
+    snapshot = _current_snapshot()
+
+    if time.time() - snapshot["fetched_at"] > ttl:
+        metrics.incr("dataset.cache.stale")
+        _refresh_in_background(ttl)
+    else:
+        metrics.incr("dataset.cache.hit")
+
+    return snapshot["tables"]
+
+def _snapshot_rounds():
+    """Rounds the served snapshot has for every institute type"""
+    snapshot = _shared_snapshot
+    return set(complete_rounds(snapshot["tables"])) if snapshot is not None else set()
+
+def _default_ttl():
+    if _refresh_schedule is None:
+        return CACHE_TTL
+    return _refresh_schedule.ttl(time.time(), _snapshot_rounds())
+
+def get_refresh_schedule():
+    """The RefreshSchedule in REFRESH_SCHEDULE, or None if it is unset or unreadable"""
+    if not REFRESH_SCHEDULE:
+        return None
     try:
-        # Create data folder if it doesn't exist
-        data_folder = "user_data"
-        if not os.path.exists(data_folder):
-            os.makedirs(data_folder)
-        
+        return RefreshSchedule.from_file(REFRESH_SCHEDULE)
+    except OSError as e:
+        print(f"[DEBUG] No refresh schedule: {e}")
+        return None
+
+def use_refresh_schedule(schedule):
+    """Take the default TTL from `schedule` (a josaa_schedule.RefreshSchedule); None restores CACHE_TTL"""
+    global _refresh_schedule
+    _refresh_schedule = schedule
+
+def start_refresh_scheduler(schedule=None):
+    """Refresh the snapshot on `schedule` (default get_refresh_schedule()) from a background thread.
+
+    Started once per process; later calls return the running scheduler.
+    The schedule also sets the TTL, so stale reads don't trigger extra
+    fetches between the scheduled ones. Returns None without a schedule.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            schedule = schedule or get_refresh_schedule()
+            if schedule is None:
+                return None
+            use_refresh_schedule(schedule)
+            _scheduler = RefreshScheduler(schedule, refresh_snapshot, _snapshot_rounds).start()
+        return _scheduler
+
+def _schedule_status():
+    if _refresh_schedule is None:
+        return {}
+    status = {"ttl_s": _default_ttl(), "loaded_rounds": sorted(_snapshot_rounds())}
+    if _scheduler is not None and _scheduler.next_refresh is not None:
+        status["next_refresh"] = datetime.fromtimestamp(_scheduler.next_refresh).isoformat(timespec='seconds')
+    return status
+
+# Current refresh cadence, to check the schedule is driving refreshes
+metrics.gauge("refresh_schedule", _schedule_status)
+
+def load_catalogs(ttl=None):
+    """{round number: catalog.OptionCatalog} for the tables load_dataset() returns"""
+    load_dataset(ttl)
+    return _current_snapshot()["catalogs"]
+
+def load_sheets(ttl=None):
+    """Load cleaned sheets as DataFrames of categorical columns (cached like load_dataset)"""
+    return {name: table.frame for name, table in load_dataset(ttl).items() if institute_type(name)}
+
+def dataset_memory():
+    """{table name: bytes} of the tables this process serves, to size worker counts per host"""
+    snapshot = _shared_snapshot
+    if snapshot is None:
+        return {}
+    return {name: sum(table.memory_usage().values()) for name, table in snapshot["tables"].items()}
+
+metrics.gauge("dataset_memory", dataset_memory)
+
+def save_user_chat_json(user_data, nits_results, iiits_results, iits_results=None):
+    """Queue complete user chat data for the append-only chat log in the project folder (see chat_log.py)"""
+    try:
+        # Only the institute types that were searched (None = not part of this exam)
+        recommendations = {}
+        for key, results, count_key in [("nits", nits_results, 'nit_count'), ("iiits", iiits_results, 'iiit_count'), ("iits", iits_results, 'iit_count')]:
+            if results is None:
+                continue
+            recommendations[key] = {
+                "count": user_data.get(count_key, len(results)),
+                "colleges": results.to_dict('records') if not results.empty else []
+            }
+
         # Create chat data structure
         chat_data = {
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "user_info": {
                 "name": user_data['name'],
                 "phone": user_data['phone'],
+                "exam": user_data.get('exam', "JEE Mains"),
                 "gender": user_data['gender'],
                 "category": user_data['category'],
                 "state": user_data['state'],
@@ -59,16 +433,7 @@ def save_user_chat_json(user_data, nits_results, iiits_results):
                 "branches": user_data['branches'].split(', ') if isinstance(user_data['branches'], str) else user_data['branches'],
                 "jee_rank": user_data['rank']
             },
-            "recommendations": {
-                "nits": {
-                    "count": user_data['nit_count'],
-                    "colleges": nits_results.to_dict('records') if not nits_results.empty else []
-                },
-                "iiits": {
-                    "count": user_data['iiit_count'],
-                    "colleges": iiits_results.to_dict('records') if not iiits_results.empty else []
-                }
-            },
+            "recommendations": recommendations,
             "filters_applied": {
                 "rank_filter": f"Close Rank >= {user_data['rank']} (User can get admission)",
                 "college_state_filter": True,
@@ -77,16 +442,8 @@ def save_user_chat_json(user_data, nits_results, iiits_results):
             }
         }
         
-        # Create filename with timestamp and user name
-        safe_name = "".join(c for c in user_data['name'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(data_folder, f"user_chat_{safe_name}_{timestamp_str}.json")
-        
-        # Save to project folder
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(chat_data, f, indent=2, ensure_ascii=False)
-        
-        return filename
+        # Written to the chat store (SQLite, or JSONL segments) by a background thread
+        return get_chat_writer().write(chat_data)
         
     except Exception as e:
         raise Exception(f"Failed to save chat JSON: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,122 @@
+import glob
+import os
+import random
+import threading
+import time
+
+import pandas as pd
+
+# A local stand-in for the parts of the gspread API that data_loader uses
+# (open_by_url, worksheets, get_all_values, values_batch_get), so fetching
+# can be exercised and timed without network access or credentials.
+#
+#   client = FakeSheetsClient.from_csv_dir("fixtures/sheets", latency=0.3, failure_rate=0.1)
+#   data_loader.set_sheets_client(client)
+#
+# Setting SHEETS_FAKE_DIR=<dir> makes data_loader serve that directory the same way
+# (SHEETS_FAKE_LATENCY=<seconds> adds latency to every call, to time the remote path).
+
+class FakeAPIError(Exception):
+    """Raised for injected failures; carries an HTTP status `code` like gspread's APIError"""
+
+    def __init__(self, code, message="Injected failure"):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+
+class FakeWorksheet:
+    def __init__(self, client, title, values):
+        self._client = client
+        self.title = title
+        self.values = values
+
+    @property
+    def row_count(self):
+        return len(self.values)
+
+    @property
+    def col_count(self):
+        return max((len(row) for row in self.values), default=0)
+
+    def get_all_values(self):
+        self._client._call("get_all_values")
+        return [list(row) for row in self.values]
+
+class FakeSpreadsheet:
+    def __init__(self, client):
+        self._client = client
+
+    def worksheets(self):
+        self._client._call("worksheets")
+        return list(self._client.worksheets.values())
+
+    def worksheet(self, title):
+        self._client._call("worksheet")
+        return self._client.worksheets[title]
+
+    def values_batch_get(self, ranges):
+        self._client._call("values_batch_get")
+        value_ranges = []
+        for a1_range in ranges:
+            # Ranges are bare sheet names (whole sheets); like the API, trailing empty cells are left out
+            values = [list(row) for row in self._client.worksheets[a1_range.strip("'")].values]
+            for row in values:
+                while row and row[-1] == '':
+                    row.pop()
+            while values and not values[-1]:
+                values.pop()
+            value_ranges.append({"range": a1_range, "values": values})
+        return {"valueRanges": value_ranges}
+
+class FakeSheetsClient:
+    """Serves worksheets from memory, with optional latency and injected failures.
+
+    `latency` seconds are slept on every API call, and a `failure_rate`
+    fraction of calls raises FakeAPIError with one of `failure_codes`.
+    `calls` counts the calls per method, for asserting how many requests a
+    refresh made.
+    """
+
+    def __init__(self, worksheets, latency=0.0, failure_rate=0.0, failure_codes=(429, 503), seed=None):
+        self.worksheets = {title: FakeWorksheet(self, title, values) for title, values in worksheets.items()}
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_codes = failure_codes
+        self.calls = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frames(cls, frames, **kwargs):
+        """Worksheets from {title: DataFrame}; the DataFrame columns become the header row"""
+        worksheets = {
+            title: [list(map(str, df.columns))] + df.astype(str).values.tolist()
+            for title, df in frames.items()
+        }
+        return cls(worksheets, **kwargs)
+
+    @classmethod
+    def from_csv_dir(cls, path, **kwargs):
+        """One worksheet per CSV file in `path`, titled after the file name ("NITs Round 5.csv")"""
+        frames = {
+            os.path.splitext(os.path.basename(file))[0]: pd.read_csv(file, dtype=str, keep_default_na=False)
+            for file in sorted(glob.glob(os.path.join(path, "*.csv")))
+        }
+        return cls.from_frames(frames, **kwargs)
+
+    def set_values(self, title, values):
+        """Replace a worksheet's contents, e.g. to simulate a new round being published"""
+        self.worksheets[title] = FakeWorksheet(self, title, values)
+
+    def open_by_url(self, url):
+        self._call("open_by_url")
+        return FakeSpreadsheet(self)
+
+    def _call(self, method):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            fail = self._random.random() < self.failure_rate
+            code = self._random.choice(self.failure_codes) if fail else None
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise FakeAPIError(code)
@@ -0,0 +1,27 @@
+import argparse
+
+from artifact import read_artifact, write_artifact
+from data_loader import CACHE_DIR, get_data_source
+from recommender import prepare_tables
+
+def ingest(out_dir=CACHE_DIR):
+    """Pull the round tables once from the data source, prepare them, and compile them into an artifact in `out_dir`"""
+    source = get_data_source()
+    sheets, fingerprints = source.fetch()
+    write_artifact(prepare_tables(sheets), out_dir, fingerprints=fingerprints, source=repr(source))
+    return read_artifact(out_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the round tables (DATA_SOURCE, default Google Sheets) into a memory-mappable artifact for the app.")
+    parser.add_argument("--out", default=CACHE_DIR, help=f"Artifact directory (default: {CACHE_DIR}, where the app reads it)")
+    args = parser.parse_args()
+
+    snapshot = ingest(args.out)
+    for name, table in snapshot["tables"].items():
+        usage = table.memory_usage()
+        parts = ", ".join(f"{part} {size / 1024:.1f}" for part, size in usage.items())
+        print(f"✅ {name}: {len(table)} rows, {sum(usage.values()) / 1024:.1f} KiB ({parts})")
+    print(f"Artifact written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import argparse
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+# JoSAA's schedule of events (josaa_schedule.txt, text extracted from the
+# brochure's annexure) and the dataset refresh times it implies. New closing
+# ranks only appear after a round's seat allocation is published, so the
+# snapshot is refreshed right at each publication, polled often until the
+# round shows up in the data, and left alone between rounds.
+
+SCHEDULE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "josaa_schedule.txt")
+# Times in the schedule are Indian Standard Time
+IST = timezone(timedelta(hours=5, minutes=30), "IST")
+
+# After a round is published, poll every BURST_INTERVAL seconds for up to BURST_WINDOW seconds until it is in the data
+BURST_WINDOW = 6 * 3600
+BURST_INTERVAL = 120
+# Refresh interval between rounds, and once the last round is in
+BETWEEN_ROUNDS_INTERVAL = 6 * 3600
+OFF_SEASON_INTERVAL = 24 * 3600
+
+# "Saturday, 14 June, 2025 10:00 Seat Allocation (Round 1)", "Thursday, 19 June, 2025 By 17:00", ...
+EVENT_LINE = re.compile(
+    r'^(?:Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday), (\d{1,2}) ([A-Za-z]+),? (\d{4})'
+    r'\s*(?:[–-]\s*)?(By\s+)?(?:(\d{1,2}):(\d{2}),?)?\s*(.*)$'
+)
+ROUND = re.compile(r'\(Round (\d+)\)')
+SEAT_ALLOCATION = re.compile(r'^Seat Allocation \(Round (\d+)\)')
+
+def parse_schedule(text):
+    """Dated events in a JoSAA schedule, in file order.
+
+    Each event is {"at": aware datetime in IST (midnight when the line has
+    no time), "title": rest of the line, "deadline": True for "By <time>"
+    lines, "round": round number mentioned in the title or None}. Lines
+    without a leading date (continuations of a wrapped cell) are skipped.
+    """
+    events = []
+    for line in text.splitlines():
+        match = EVENT_LINE.match(line.strip())
+        if not match:
+            continue
+        day, month, year, by, hour, minute, title = match.groups()
+        try:
+            at = datetime.strptime(f"{day} {month} {year}", "%d %B %Y")
+        except ValueError:
+            continue
+        if hour is not None:
+            at = at.replace(hour=int(hour), minute=int(minute))
+        round_no = ROUND.search(title)
+        events.append({
+            "at": at.replace(tzinfo=IST),
+            "title": title.strip(),
+            "deadline": by is not None,
+            "round": int(round_no.group(1)) if round_no else None,
+        })
+    return events
+
+def load_schedule(path=SCHEDULE_FILE):
+    with open(path, encoding='utf-8') as f:
+        return parse_schedule(f.read())
+
+def seat_allocations(events):
+    """[(round number, publication time)] of the seat allocation rounds, in time order"""
+    allocations = {}
+    for event in events:
+        match = SEAT_ALLOCATION.match(event["title"])
+        if match:
+            allocations.setdefault(int(match.group(1)), event["at"])
+    return sorted(allocations.items(), key=lambda allocation: allocation[1])
+
+class RefreshSchedule:
+    """When the dataset should be refreshed, given the seat allocation publication times.
+
+    Times are epoch seconds, like the snapshot's fetched_at. `loaded_rounds`
+    are the rounds already in the data; a published round that isn't is
+    polled for every `burst_interval` seconds during `burst_window`.
+    Otherwise the data is refreshed every `between_rounds` seconds (every
+    `off_season` seconds after the last round), and always right at the
+    next publication.
+    """
+
+    def __init__(self, allocations, burst_window=BURST_WINDOW, burst_interval=BURST_INTERVAL,
+                 between_rounds=BETWEEN_ROUNDS_INTERVAL, off_season=OFF_SEASON_INTERVAL):
+        self.allocations = [(round_no, at.timestamp()) for round_no, at in allocations]
+        self.burst_window = burst_window
+        self.burst_interval = burst_interval
+        self.between_rounds = between_rounds
+        self.off_season = off_season
+
+    @classmethod
+    def from_file(cls, path=SCHEDULE_FILE, **intervals):
+        return cls(seat_allocations(load_schedule(path)), **intervals)
+
+    def interval(self, now, loaded_rounds=()):
+        """Seconds between refreshes at `now`"""
+        for round_no, published in self.allocations:
+            if round_no not in loaded_rounds and published <= now < published + self.burst_window:
+                return self.burst_interval
+        if not self.allocations or now >= self.allocations[-1][1] + self.burst_window:
+            return self.off_season
+        return self.between_rounds
+
+    def next_refresh(self, now, loaded_rounds=()):
+        """Epoch seconds of the next refresh after one at `now`"""
+        due = now + self.interval(now, loaded_rounds)
+        for round_no, published in self.allocations:
+            if round_no not in loaded_rounds and now < published:
+                return min(due, published)
+        return due
+
+    def ttl(self, now, loaded_rounds=()):
+        """How long a snapshot stays fresh for readers at `now`.
+
+        Twice the refresh interval: while a scheduler keeps the snapshot
+        fresh readers never refresh themselves, and processes without one
+        still refresh at the schedule's pace.
+        """
+        return 2 * self.interval(now, loaded_rounds)
+
+class RefreshScheduler:
+    """Calls `refresh()` from a background thread at the times a RefreshSchedule gives.
+
+    `loaded_rounds()` returns the rounds currently in the data. A failed
+    refresh is retried after the schedule's burst interval.
+    """
+
+    def __init__(self, schedule, refresh, loaded_rounds):
+        self.schedule = schedule
+        self.refresh = refresh
+        self.loaded_rounds = loaded_rounds
+        self.next_refresh = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="refresh-scheduler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            now = time.time()
+            self.next_refresh = self.schedule.next_refresh(now, self.loaded_rounds())
+            if self._stop.wait(max(0.0, self.next_refresh - now)):
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[DEBUG] Scheduled refresh failed: {e}")
+                if self._stop.wait(self.schedule.burst_interval):
+                    return
+
+def simulate(schedule, start, end, delay):
+    """Number of refreshes from `start` to `end` (epoch seconds) if each round shows up in the data `delay` seconds after publication"""
+    refreshes = 0
+    loaded = set()
+    now = start
+    while True:
+        now = schedule.next_refresh(now, loaded)
+        if now >= end:
+            return refreshes
+        refreshes += 1
+        loaded = {round_no for round_no, published in schedule.allocations if published + delay <= now}
+
+def _parse_time(value):
+    return datetime.strptime(value, "%Y-%m-%d %H:%M").replace(tzinfo=IST)
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the JoSAA schedule and the dataset refresh times it implies.")
+    parser.add_argument("--file", default=SCHEDULE_FILE)
+    parser.add_argument("--at", help="Moment to plan for, 'YYYY-MM-DD HH:MM' IST (default: now)")
+    parser.add_argument("--loaded", default="", help="Comma-separated rounds already in the data, e.g. 1,2")
+    parser.add_argument("--delay", type=float, default=1800, help="Seconds after publication a round reaches the data, for the season estimate")
+    parser.add_argument("--ttl", type=float, default=600, help="Fixed TTL to compare the season estimate with")
+    args = parser.parse_args()
+
+    events = load_schedule(args.file)
+    allocations = seat_allocations(events)
+    print(f"{len(events)} dated events; seat allocations:")
+    for round_no, at in allocations:
+        print(f"  Round {round_no}: {at:%a %d %b %Y %H:%M} IST")
+
+    schedule = RefreshSchedule(allocations)
+    now = _parse_time(args.at).timestamp() if args.at else time.time()
+    loaded = {int(r) for r in args.loaded.split(",") if r.strip()}
+    due = datetime.fromtimestamp(schedule.next_refresh(now, loaded), IST)
+    print(f"At {datetime.fromtimestamp(now, IST):%Y-%m-%d %H:%M} IST: refresh every {schedule.interval(now, loaded):.0f} s, "
+          f"next at {due:%Y-%m-%d %H:%M:%S} IST, readers' TTL {schedule.ttl(now, loaded):.0f} s")
+
+    if allocations:
+        start = allocations[0][1].timestamp() - 86400
+        end = allocations[-1][1].timestamp() + 86400
+        print(f"Season estimate (a day either side, rounds reach the data after {args.delay:.0f} s): "
+              f"{simulate(schedule, start, end, args.delay)} scheduled refreshes vs {int((end - start) // args.ttl)} with a {args.ttl:.0f} s TTL")
+
+if __name__ == "__main__":
+    main()
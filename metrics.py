@@ -0,0 +1,173 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Upper bounds (ms) of the cumulative histogram buckets
+BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+# Latest samples kept per stage for rolling percentiles
+WINDOW = 1000
+
+class Histogram:
+    """Latency histogram with fixed buckets plus a rolling window of recent samples"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.bucket_counts = [0] * (len(BUCKETS_MS) + 1)
+        self.recent = deque(maxlen=WINDOW)
+
+    def observe(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        self.bucket_counts[np.searchsorted(BUCKETS_MS, ms)] += 1
+        self.recent.append(ms)
+
+    def summary(self):
+        recent = np.array(self.recent) if self.recent else np.zeros(1)
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": float(np.percentile(recent, 50)),
+            "p90_ms": float(np.percentile(recent, 90)),
+            "p99_ms": float(np.percentile(recent, 99)),
+            "max_recent_ms": float(recent.max()),
+            "buckets": {f"le_{bound}": count for bound, count in zip(BUCKETS_MS + ["inf"], np.cumsum(self.bucket_counts).tolist())},
+        }
+
+class Metrics:
+    """In-process counters and per-stage latency histograms, safe to use from any thread"""
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, ms):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(ms)
+
+    def gauge(self, name, fn):
+        """Report fn() (any JSON value, e.g. a cache's size and hit rate) as `name` in every snapshot"""
+        with self._lock:
+            self._gauges[name] = fn
+
+    @contextmanager
+    def timed(self, stage):
+        """Time the enclosed block as `stage`; failures are also counted as '<stage>.errors'"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.incr(f"{stage}.errors")
+            raise
+        finally:
+            self.observe(stage, (time.perf_counter() - started) * 1000)
+
+    def snapshot(self):
+        with self._lock:
+            uptime = time.time() - self.started
+            gauges = dict(self._gauges)
+            snapshot = {
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "uptime_s": uptime,
+                "counters": dict(self._counters),
+                "stages": {name: histogram.summary() for name, histogram in self._histograms.items()},
+                "throughput_per_s": {name: histogram.count / uptime for name, histogram in self._histograms.items()} if uptime else {},
+            }
+        # Gauges may take their own locks, so they are read outside ours
+        snapshot["gauges"] = {name: fn() for name, fn in gauges.items()}
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self._counters.clear()
+            self._histograms.clear()
+
+# The process-wide registry used by data_loader, stream.py and chatbot.py
+REGISTRY = Metrics()
+incr = REGISTRY.incr
+observe = REGISTRY.observe
+timed = REGISTRY.timed
+snapshot = REGISTRY.snapshot
+gauge = REGISTRY.gauge
+
+def dump(path):
+    """Write the current metrics to `path` as JSON (atomically)"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot(), f, indent=2)
+    os.replace(tmp_path, path)
+
+def start_dump_thread(path, interval=30):
+    """Dump metrics to `path` every `interval` seconds, and once more at exit"""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                dump(path)
+            except OSError as e:
+                print(f"[DEBUG] Could not write metrics to {path}: {e}")
+
+    threading.Thread(target=run, name="metrics-dump", daemon=True).start()
+    atexit.register(dump, path)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') not in ('', '/metrics'):
+            self.send_error(404)
+            return
+        body = json.dumps(snapshot(), indent=2).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_metrics(port, host="127.0.0.1"):
+    """Serve the metrics as JSON on http://host:port/metrics from a background thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+def start_exporters():
+    """Start the exporters configured by METRICS_PORT / METRICS_DUMP_FILE, once per process"""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+        port = os.environ.get("METRICS_PORT")
+        if port:
+            try:
+                serve_metrics(int(port))
+            except OSError as e:
+                # Another worker on this host already serves the port
+                print(f"[DEBUG] Metrics endpoint not started on port {port}: {e}")
+
+        dump_file = os.environ.get("METRICS_DUMP_FILE")
+        if dump_file:
+            start_dump_thread(dump_file, int(os.environ.get("METRICS_DUMP_INTERVAL", "30")))
@@ -0,0 +1,120 @@
+# Option catalogs shared by stream.py and chatbot.py.
+# Built once per process on first import, not on every Streamlit rerun.
+from programs import canonical_options
+
+gender_options = ["Gender-Neutral", "Female-only (including Supernumerary)"]
+category_options = ["SC", "ST", "EWS", "EWS (PwD)", "OBC-NCL", "OBC-NCL (PwD)", "OPEN", "OPEN (PwD)", "SC (PwD)", "ST (PwD)"]
+state_options = ["Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh", "Delhi", "Goa", "Gujarat", "Haryana", "Himachal Pradesh", "Jammu and Kashmir", "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh", "Manipur", "Meghalaya", "Mizoram", "Maharashtra", "Nagaland", "Odisha", "Puducherry", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana", "Tripura", "Uttar Pradesh", "Uttarakhand", "West Bengal"]
+
+degree_options = [
+    "Bachelor of Technology",
+    "Bachelor and Master of Technology (Dual Degree)",
+    "Integrated Master of Science",
+    "Integrated B. Tech. and M. Tech",
+    "Bachelor of Architecture",
+    "Bachelor of Planning",
+    "Bachelor of Science and Master of Science (Dual Degree)",
+    "B.Tech. + M.Tech./MS (Dual Degree)",
+]
+
+branch_options = [
+    "Artificial Intelligence",
+    "Aerospace Engineering",
+    "Architecture",
+    "Architecture and Planning",
+    "Artificial Intelligence and Data Engineering",
+    "Artificial Intelligence and Data Science",
+    "Artificial Intelligence and Machine Learning",
+    "B.Tech in Mathematics and Computing",
+    "B.Tech in Mechanical Engineering and M.Tech in AI and Robotics",
+    "B.Tech. in Electronics and Communication Engineering and M.Tech. in Communication Systems",
+    "B.Tech. in Electronics and Communication Engineering and M.Tech. in VLSI Design",
+    "Bio Medical Engineering",
+    "Bio Technology",
+    "Biotechnology",
+    "Biotechnology and Biochemical Engineering",
+    "Civil Engineering",
+    "Ceramic Engineering",
+    "Ceramic Engineering and M.Tech Industrial Ceramic",
+    "Chemical Engineering",
+    "Chemical Technology",
+    "Chemistry",
+    "Civil Engineering with Specialization in Construction Technology and Management",
+    "Computational and Data Science",
+    "Computational Mathematics",
+    "Computer Science",
+    "Computer Science and Artificial Intelligence",
+    "Computer Science and Business",
+    "Computer Science and Engineering",
+    "Computer Science and Engineering (Artificial Intelligence)",
+    "Computer Science Engineering (Artificial lntelligence and Machine Learning)",
+    "Computer Science Engineering (Data Science and Analytics)",
+    "Computer Science and Engineering (Cyber Physical System)",
+    "Computer Science and Engineering (Cyber Security)",
+    "Computer Science and Engineering (Data Science)",
+    "Computer Science and Engineering (with Specialization of Data Science and Artificial Intelligence)",
+    "Computer Science Engineering (Human Computer lnteraction and Gaming Technology)",
+    "CSE ( Data Science & Analytics)",
+    "Data Science and Engineering",
+    "Data Science and Artificial Intelligence",
+    "Electronics and Communication Engineering",
+    "Electrical and Electronics Engineering",
+    "Electrical Engineering",
+    "Electrical Engineering with Specialization In Power System Engineering",
+    "Electronics and Communication Engineering (Internet of Things)",
+    "Electronics and Communication Engineering (with Specialization of Embedded Systems and Internet of Things)",
+    "Electronics and Communication Engineering with specialization in Design and Manufacturing",
+    "Electronics and Communication Engineering (VLSI Design and Technology)",
+    "Electronics and Communication Engineering with Specialization in Microelectronics and VLSI System Design",
+    "Electronics and Communication Engineering with specialization in VLSI and Embedded Systems",
+    "Electronics and Instrumentation Engineering",
+    "Electronics and Telecommunication Engineering",
+    "Electronics and VLSI Engineering",
+    "Engineering and Computational Mechanics",
+    "Engineering Physics",
+    "Food Process Engineering",
+    "Industrial and Production Engineering",
+    "Information Technology-Business Informatics",
+    "Integrated B. Tech.(IT) and M. Tech (IT)",
+    "Integrated B. Tech.(IT) and MBA",
+    "Industrial Chemistry",
+    "Industrial Design",
+    "Industrial Internet of Things",
+    "Information Technology",
+    "Instrumentation and Control Engineering",
+    "Life Science",
+    "Material Science and Engineering",
+    "Materials Engineering",
+    "Materials Science and Engineering",
+    "Materials Science and Metallurgical Engineering",
+    "Mathematics",
+    "Mathematics & Computing",
+    "Mathematics and Computing",
+    "Mathematics and Computing Technology",
+    "Mathematics and Scientific Computing",
+    "Mathematics and Data Science",
+    "Mechanical Engineering",
+    "Mechanical Engineering with Specialization in Manufacturing and Industrial Engineering",
+    "Mechanical Engineering with specialization in Design and Manufacturing",
+    "Mechatronics and Automation Engineering",
+    "Metallurgical and Materials Engineering",
+    "Metallurgy and Materials Engineering",
+    "Microelectronics & VLSI Engineering",
+    "Mining Engineering",
+    "Physics",
+    "Planning",
+    "Production and Industrial Engineering",
+    "Production Engineering",
+    "ROBOTICS & AUTOMATION",
+    "SUSTAINABLE ENERGY TECHNOLOGIES",
+    "Smart Manufacturing",
+    "Textile Technology",
+    "VLSI Design and Technology"
+]
+
+# Spellings of the same program (e.g. "Bio Technology" / "Biotechnology") match the same rows; list each once
+degree_options = canonical_options(degree_options)
+branch_options = canonical_options(branch_options)
+
+# Institute types each exam's rank is used for
+exam_institutes = {"JEE Mains": ("NIT", "IIIT"), "JEE Advanced": ("IIT",)}
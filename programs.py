@@ -0,0 +1,56 @@
+import re
+
+# Canonical matching keys for degree and branch names.
+#
+# The sheets (and the option lists built from them) spell the same program
+# in several ways: "Bio Technology" / "Biotechnology", "Mathematics &
+# Computing" / "Mathematics and Computing", OCR typos like "lntelligence",
+# stray spaces inside brackets. canonical_key() folds all of these to one
+# key, so a selection matches every spelling of a program.
+
+# Whole-phrase synonyms, applied after punctuation and spacing are normalized
+SYNONYMS = [
+    (r'\bbio technology\b', 'biotechnology'),
+    (r'\bbio medical\b', 'biomedical'),
+    (r'\bbio chemical\b', 'biochemical'),
+    (r'\bcse\b', 'computer science and engineering'),
+    (r'\bcomputer science engineering\b', 'computer science and engineering'),
+    (r'\bmaterial science\b', 'materials science'),
+    (r'\bmetallurgy and materials\b', 'metallurgical and materials'),
+    (r'\bb\.? ?tech\.?', 'btech'),
+    (r'\bm\.? ?tech\.?', 'mtech'),
+    (r'\bspecialisation\b', 'specialization'),
+]
+
+def canonical_key(text):
+    """Matching key of a degree or branch name, e.g. 'CSE ( Data Science & Analytics)' ->
+    'computer science and engineering (data science and analytics)'"""
+    key = str(text).lower().strip()
+    key = key.replace('&', ' and ')
+    # OCR reads a leading capital I as l; no English word starts with "ln"
+    key = re.sub(r'\bln', 'in', key)
+    key = re.sub(r'\s+', ' ', key)
+    key = re.sub(r'\s*\(\s*', ' (', key)
+    key = re.sub(r'\s*\)', ')', key)
+    key = re.sub(r'\s*-\s*', '-', key)
+    for pattern, replacement in SYNONYMS:
+        key = re.sub(pattern, replacement, key)
+    return re.sub(r'\s+', ' ', key).strip()
+
+def canonical_options(options):
+    """`options` without spellings that fold to an earlier option's key (first spelling wins)"""
+    seen = set()
+    unique = []
+    for option in options:
+        key = canonical_key(option)
+        if key not in seen:
+            seen.add(key)
+            unique.append(option)
+    return unique
+
+def program_dictionary(values):
+    """{canonical key: every spelling in `values` that folds to it}, for auditing the folding rules"""
+    spellings = {}
+    for value in values:
+        spellings.setdefault(canonical_key(value), set()).add(str(value).strip())
+    return {key: sorted(spelled) for key, spelled in sorted(spellings.items())}
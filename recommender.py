@@ -1,55 +1,578 @@
+import itertools
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 
-def filter_colleges(df, gender, category, rank, degrees, branches, state=None, is_nit=False):
-    df = df.copy()
-    
-    df['close rank'] = pd.to_numeric(df['close rank'], errors='coerce')
-    df = df.dropna(subset=['close rank'])
-    
+from programs import canonical_key
+
+# Set RECOMMENDER_DEBUG=1 to print how the NIT quota rule treats each candidate row
+DEBUG = os.environ.get("RECOMMENDER_DEBUG") == "1"
+
+# String columns that queries filter on; matched lowercased and stripped
+KEY_COLUMNS = ['institute', 'gender', 'category', 'degree', 'branch', 'quota', 'college state']
+# String columns that are only displayed; kept exactly as in the sheet
+LABEL_COLUMNS = ['college name']
+OUTPUT_COLUMNS = ['college name', 'close rank']
+# Key columns that partition the close-rank index
+INDEX_COLUMNS = ['institute', 'gender', 'category', 'degree', 'branch', 'quota']
+# Institute type of each sheet, by the sheet name prefix ("nits round 5" -> "NIT")
+INSTITUTE_TYPES = {'nits': 'NIT', 'iiits': 'IIIT', 'iits': 'IIT'}
+# Profiles whose rank-independent matches are memoized (see QueryCache)
+QUERY_CACHE_SIZE = int(os.environ.get("RECOMMENDER_CACHE_SIZE", "1024"))
+
+# Distinguishes tables across snapshot refreshes, for cache keys
+_table_tokens = itertools.count()
+
+def normalize(value):
+    return str(value).lower().strip()
+
+# Degrees and branches are matched on their canonical program key (see programs.py)
+NORMALIZERS = {'degree': canonical_key, 'branch': canonical_key}
+
+def normalizer(column):
+    return NORMALIZERS.get(column, normalize)
+
+def _code_dtype(size):
+    """Smallest integer type holding `size` codes (and -1)"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if size <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def _rank_array(ranks):
+    """Close ranks as int32 when they are all whole numbers (JoSAA ranks are), else as they are"""
+    limits = np.iinfo(np.int32)
+    if np.isfinite(ranks).all() and (ranks == np.round(ranks)).all() and (not len(ranks) or limits.min <= ranks.min() and ranks.max() <= limits.max):
+        return ranks.astype(np.int32)
+    return ranks
+
+class PreparedTable:
+    """A cutoff table cleaned once at load time, ready for repeated queries.
+
+    Every string column in KEY_COLUMNS and LABEL_COLUMNS is stored as an
+    integer code array plus an array of labels (`labels[column][code]`).
+    Key columns are coded on their lowercased, stripped value; degrees and
+    branches on their canonical program key, so every spelling of a
+    program shares one code. Codes use the smallest integer type that fits
+    (int8 for most columns) and 'close rank' is an int32 array (float if a
+    sheet has fractional ranks). Other columns of the sheet are dropped.
+    Rows are sorted by close rank, so any subset taken in row order is
+    already sorted.
+    """
+
+    def __init__(self, df):
+        ranks = pd.to_numeric(df['close rank'], errors='coerce')
+        df = df[ranks.notna()]
+        ranks = ranks[ranks.notna()].to_numpy(dtype=float)
+
+        order = np.argsort(ranks, kind='stable')
+        self.close_rank = _rank_array(ranks[order])
+        df = df.iloc[order]
+
+        self.codes = {}
+        self.labels = {}
+        for column in KEY_COLUMNS + LABEL_COLUMNS:
+            if column in df.columns:
+                values = df[column].astype(str).reset_index(drop=True)
+            else:
+                values = pd.Series([''] * len(df))
+            codes, spellings = pd.factorize(values)
+            if column in KEY_COLUMNS:
+                # Normalize each distinct spelling once rather than every row
+                keys, _ = pd.factorize(pd.Index(spellings).map(normalizer(column)))
+                codes = keys[codes]
+            # Label each code with the first spelling that occurs in the sheet
+            _, first = np.unique(codes, return_index=True)
+            self.codes[column] = codes.astype(_code_dtype(len(first)))
+            self.labels[column] = values.to_numpy(dtype=object)[first]
+
+        # The frame is rebuilt from the codes on demand (see `frame`)
+        self._frame = None
+        self._build_keys()
+        self.index = RankIndex(self)
+        self.token = next(_table_tokens)
+
+    @classmethod
+    def from_arrays(cls, close_rank, codes, labels, index):
+        """Rebuild a table from its arrays (e.g. memory-mapped from an ingest artifact)"""
+        table = cls.__new__(cls)
+        table.close_rank = close_rank
+        table.codes = codes
+        table.labels = labels
+        table.index = index
+        table._frame = None
+        table._build_keys()
+        table.token = next(_table_tokens)
+        return table
+
+    def _build_keys(self):
+        self.keys = {
+            column: {normalizer(column)(label): code for code, label in enumerate(self.labels[column])}
+            for column in KEY_COLUMNS
+        }
+
+    @property
+    def frame(self):
+        """The cleaned table as a DataFrame of categorical columns, in close rank order"""
+        if self._frame is None:
+            columns = {
+                column: pd.Categorical.from_codes(np.asarray(self.codes[column]), categories=self.labels[column])
+                for column in LABEL_COLUMNS + KEY_COLUMNS
+            }
+            columns['close rank'] = np.asarray(self.close_rank)
+            self._frame = pd.DataFrame(columns)
+        return self._frame
+
+    def __len__(self):
+        return len(self.close_rank)
+
+    def memory_usage(self):
+        """Bytes held by each part of the table; memory-mapped arrays count in full"""
+        index = self.index
+        return {
+            'close rank': np.asarray(self.close_rank).nbytes,
+            'codes': sum(np.asarray(codes).nbytes for codes in self.codes.values()),
+            'labels': sum(labels.nbytes + sum(sys.getsizeof(label) for label in labels) for labels in self.labels.values()),
+            'index': sum(np.asarray(getattr(index, part)).nbytes for part in ['positions', 'close_rank', 'partition_keys', 'starts', 'ends']),
+        }
+
+    def freeze(self):
+        """Make the arrays read-only, for tables shared between sessions"""
+        arrays = [self.close_rank, self.index.positions, self.index.close_rank] + list(self.codes.values())
+        for array in arrays:
+            array.flags.writeable = False
+
+    def code(self, column, value):
+        """Code of a single value in a key column, or -1 if it never occurs"""
+        return self.keys[column].get(normalizer(column)(value), -1)
+
+    def codes_for(self, column, values):
+        """Codes of all values that occur in a key column"""
+        keys = self.keys[column]
+        return np.array(sorted({keys[v] for v in map(normalizer(column), values) if v in keys}), dtype=np.int32)
+
+    def rows(self, positions):
+        """Output rows ('college name', 'close rank') at the given row positions"""
+        return pd.DataFrame({
+            'college name': self.labels['college name'][self.codes['college name'][positions]],
+            'close rank': self.close_rank[positions],
+        })
+
+class RankIndex:
+    """Row positions of a PreparedTable partitioned by INDEX_COLUMNS.
+
+    Each partition is sorted by close rank, so the rows a rank is eligible
+    for are found with one binary search per partition.
+    """
+
+    def __init__(self, table):
+        key_codes = [table.codes[column] for column in INDEX_COLUMNS]
+        # lexsort is stable, so rows stay in close rank order within a partition
+        positions = np.lexsort(key_codes[::-1]).astype(np.int32)
+
+        keys = np.column_stack([codes[positions] for codes in key_codes])
+        starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)]).astype(np.int32) if len(keys) else np.array([], dtype=np.int32)
+        ends = np.r_[starts[1:], len(keys)].astype(np.int32)
+        self._set_arrays(positions, table.close_rank[positions], keys[starts], starts, ends)
+
+    @classmethod
+    def from_arrays(cls, positions, close_rank, partition_keys, starts, ends):
+        index = cls.__new__(cls)
+        index._set_arrays(positions, close_rank, partition_keys, starts, ends)
+        return index
+
+    def _set_arrays(self, positions, close_rank, partition_keys, starts, ends):
+        self.positions = positions
+        self.close_rank = close_rank
+        self.partition_keys = partition_keys
+        self.starts = starts
+        self.ends = ends
+        self.partitions = {
+            tuple(key): (start, end)
+            for key, start, end in zip(partition_keys.tolist(), starts.tolist(), ends.tolist())
+        }
+
+    def lookup(self, institutes, gender, category, degrees, branches, quotas, rank, sort=True):
+        """Row positions (in close rank order) of all rows with close rank >= rank.
+
+        `quotas` maps each institute code to the quota codes to search for it.
+        With sort=False the positions are returned unordered.
+        """
+        slices = []
+        for institute in institutes:
+            for degree in degrees:
+                for branch in branches:
+                    for quota in quotas[institute]:
+                        bounds = self.partitions.get((institute, gender, category, degree, branch, quota))
+                        if bounds is None:
+                            continue
+                        start, end = bounds
+                        start += np.searchsorted(self.close_rank[start:end], rank, side='left')
+                        if start < end:
+                            slices.append(self.positions[start:end])
+
+        if not slices:
+            return np.array([], dtype=np.int32)
+        if not sort:
+            return np.concatenate(slices)
+        # Table rows are sorted by close rank, so sorting positions merges the slices by rank
+        return np.sort(np.concatenate(slices), kind='stable')
+
+def institute_type(sheet_name):
+    """Institute type of a sheet from its name, e.g. 'nits round 5' -> 'NIT'"""
+    return INSTITUTE_TYPES.get(sheet_name.split(' ')[0])
+
+def sheet_round(sheet_name):
+    """Round number of a sheet from its name, e.g. 'nits round 5' -> 5"""
+    return int(sheet_name.rsplit(' ', 1)[-1])
+
+def available_rounds(tables):
+    """Rounds for which the dataset has a combined table, oldest first"""
+    return sorted(sheet_round(name) for name in tables if name.startswith("all round "))
+
+def complete_rounds(tables, institutes=None):
+    """Rounds every institute type in `institutes` (default: every type in the dataset) has a sheet for, oldest first.
+
+    Round tabs are published one institute type at a time, so a round can
+    be available before it is complete. Empty tables don't count.
+    """
+    rounds = {}
+    for name, table in tables.items():
+        if institute_type(name) and len(table):
+            rounds.setdefault(sheet_round(name), set()).add(institute_type(name))
+    wanted = set(institutes) if institutes is not None else set().union(*rounds.values())
+    return sorted(round_no for round_no, found in rounds.items() if wanted <= found)
+
+def latest_round(tables, institutes=None):
+    """Latest round that is complete for `institutes` (see complete_rounds)"""
+    rounds = complete_rounds(tables, institutes)
+    if not rounds:
+        raise ValueError(f"No round has sheets for {', '.join(institutes or INSTITUTE_TYPES.values())}")
+    return rounds[-1]
+
+def combine_sheets(sheets, round_no=5):
+    """One institute-tagged table with every institute type's sheet for a round"""
+    frames = []
+    for name, df in sheets.items():
+        if name.endswith(f" round {round_no}") and institute_type(name):
+            frames.append(df.assign(institute=institute_type(name)))
+    return pd.concat(frames, ignore_index=True)
+
+def prepare_tables(sheets, reuse=None):
+    """Build a PreparedTable for every sheet in a load_sheets() result, plus a combined 'all round <n>' table per round.
+
+    Tables in `reuse` (by sheet name) are kept instead of being prepared again.
+    """
+    reuse = reuse or {}
+    tables = {name: reuse[name] if name in reuse else PreparedTable(df) for name, df in sheets.items()}
+    for round_no in sorted({sheet_round(name) for name in sheets if institute_type(name)}):
+        tables[f"all round {round_no}"] = PreparedTable(combine_sheets(sheets, round_no))
+    return tables
+
+def _trace_quota_rule(table, positions, user_state, same_state, include):
+    frame = table.frame
+    for position, same, result in zip(positions, same_state, include):
+        row = frame.iloc[position]
+        print(f"[DEBUG] College: {row.get('college name', '')}")
+        print(f"[DEBUG] College State: '{normalize(row.get('college state', ''))}' | User State: '{normalize(user_state)}' | Quota: '{str(row.get('quota', '')).upper().strip()}'")
+        if same:
+            print(f"[DEBUG] Same state - Include: {result} (quota should be HS)")
+        else:
+            print(f"[DEBUG] Different state - Include: {result} (quota should be OS)")
+
+def eligible_positions(table, gender, category, rank, degrees, branches, state=None, is_nit=False, debug=DEBUG, institutes=None, sort=True):
+    """Row positions of `table` matching a query, in close rank order (unordered with sort=False).
+
+    `institutes` restricts a combined table to some institute types (default: all).
+    The NIT home-state quota rule applies to the NIT rows of a combined
+    table, or to every row of a single table passed with is_nit=True.
+    """
+    codes = table.codes
+
+    if institutes is None:
+        institute_codes = list(range(len(table.keys['institute'])))
+    else:
+        institute_codes = table.codes_for('institute', institutes).tolist()
+    if is_nit:
+        nit_codes = institute_codes
+    else:
+        nit_codes = [code for code in institute_codes if code == table.code('institute', 'NIT')]
+    apply_quota_rule = bool(state) and bool(nit_codes)
+
+    all_quotas = range(len(table.keys['quota']))
+    nit_quotas = [table.code('quota', 'HS'), table.code('quota', 'OS')]
+    quotas = {code: nit_quotas if apply_quota_rule and code in nit_codes else all_quotas for code in institute_codes}
+
     # MODIFIED: Show only colleges where Close Rank >= User's Rank (user can get admission)
-    filters = (
-        (df['gender'].str.lower().str.strip() == gender.lower().strip()) &
-        (df['category'].str.lower().str.strip() == category.lower().strip()) &
-        (df['close rank'] >= float(rank)) &
-        (df['degree'].isin(degrees)) &
-        (df['branch'].isin(branches))
+    positions = table.index.lookup(
+        institute_codes,
+        table.code('gender', gender),
+        table.code('category', category),
+        table.codes_for('degree', degrees),
+        table.codes_for('branch', branches),
+        quotas,
+        float(rank),
+        sort=sort
     )
-    
-    df_filtered = df[filters].copy()
-    
-    if df_filtered.empty:
-        return df_filtered[['college name', 'close rank']]
-    
-    if is_nit and state:
-        def should_include_college(row):
-            college_state = str(row.get('college state', '')).lower().strip()
-            # Fix: Handle state parameter correctly - it comes as a list from stream.py
-            user_state = state[0].lower().strip() if isinstance(state, list) else str(state).lower().strip()
-            quota = str(row.get('quota', '')).upper().strip()
-            
-            print(f"[DEBUG] College: {row.get('college name', '')}")
-            print(f"[DEBUG] College State: '{college_state}' | User State: '{user_state}' | Quota: '{quota}'")
-            
-            if college_state == user_state:
-                # Same state: Only HS quota
-                result = quota == 'HS'
-                print(f"[DEBUG] Same state - Include: {result} (quota should be HS)")
-                return result
-            else:
-                # Different state: Only OS quota
-                result = quota == 'OS'
-                print(f"[DEBUG] Different state - Include: {result} (quota should be OS)")
-                return result
-        
-        df_filtered = df_filtered[df_filtered.apply(should_include_college, axis=1)].copy()
-        
-        if df_filtered.empty:
-            return df_filtered[['college name', 'close rank']]
-        
-        # Sort by close rank (ascending) - lowest closing rank first (easiest to get)
-        df_filtered = df_filtered.sort_values(by='close rank', ascending=True)
+
+    if not apply_quota_rule:
+        return positions
+
+    # Home state colleges: only HS quota seats; other state colleges: only OS quota seats
+    # Fix: Handle state parameter correctly - it comes as a list from stream.py
+    user_state = state[0] if isinstance(state, list) else state
+    same_state = codes['college state'][positions] == table.code('college state', user_state)
+    quota = codes['quota'][positions]
+    include = np.where(same_state, quota == table.code('quota', 'HS'), quota == table.code('quota', 'OS'))
+    # Rows of other institute types are not subject to the rule
+    include |= ~np.isin(codes['institute'][positions], nit_codes)
+
+    if debug:
+        _trace_quota_rule(table, positions, user_state, same_state, include)
+
+    return positions[include]
+
+def top_positions(positions, limit=None, offset=0):
+    """positions[offset:offset + limit] in close rank order (all from `offset` if limit is None).
+
+    Rows are pre-sorted by close rank, so the best ranked rows are the
+    smallest positions; a page only needs a partial selection of them
+    rather than a sort of every match.
+    """
+    if limit is None:
+        return np.sort(positions, kind='stable')[offset:]
+    end = offset + limit
+    if end < len(positions):
+        positions = np.partition(positions, end - 1)[:end]
+    return np.sort(positions)[offset:]
+
+def _page(table, positions, limit, offset):
+    """Output rows of one page of `positions`; attrs['total'] holds the number of matches"""
+    rows = table.rows(top_positions(positions, limit, offset))
+    rows.attrs['total'] = len(positions)
+    return rows
+
+def filter_colleges(df, gender, category, rank, degrees, branches, state=None, is_nit=False, debug=DEBUG, limit=None, offset=0):
+    """Matching colleges in close rank order; `limit`/`offset` return one page (see top_positions)"""
+    # Accept a raw DataFrame too, but callers should pass a PreparedTable built at load time
+    table = df if isinstance(df, PreparedTable) else PreparedTable(df)
+
+    # Rows are pre-sorted by close rank (ascending) - lowest closing rank first (easiest to get)
+    positions = eligible_positions(table, gender, category, rank, degrees, branches, state=state, is_nit=is_nit, debug=debug, sort=False)
+    return _page(table, positions, limit, offset)
+
+def _possible_institutes(catalog, gender, category, degrees, branches, institutes):
+    """Institute types the catalog has any program for in this selection (all of them without a catalog)"""
+    if catalog is None:
+        return list(institutes)
+    return [institute for institute in institutes if catalog.count(gender, category, degrees, branches, institutes=[institute])]
+
+def recommend(table, gender, category, rank, degrees, branches, state=None, institutes=('NIT', 'IIIT'), debug=DEBUG, catalog=None, limit=None, offset=0, cache=None):
+    """Evaluate a profile against several institute types in one pass over a combined table.
+
+    `table` is the institute-tagged table from combine_sheets() (the
+    'all round 5' entry of load_dataset()). Returns {institute type: results},
+    each in filter_colleges' format.
+
+    With the table's `catalog` (see catalog.OptionCatalog), institute types
+    that have no program for the selection are answered without a lookup.
+    `limit`/`offset` page each institute type's results as in filter_colleges.
+    With a `cache` (e.g. query_cache), profiles seen before are answered
+    from their memoized matches.
+    """
+    if cache is not None and not debug:
+        return cache.sweep(table, gender, category, degrees, branches, state=state, institutes=institutes, catalog=catalog).at(rank, limit, offset)
+
+    searched = _possible_institutes(catalog, gender, category, degrees, branches, institutes)
+    if not searched:
+        positions = np.array([], dtype=np.int32)
+    else:
+        positions = eligible_positions(table, gender, category, rank, degrees, branches, state=state, debug=debug, institutes=searched, sort=False)
+    institute_of_row = table.codes['institute'][positions]
+    return {
+        institute: _page(table, positions[institute_of_row == table.code('institute', institute)], limit, offset)
+        for institute in institutes
+    }
+
+class RankSweep:
+    """Eligibility of one profile across a range of ranks, from a single lookup.
+
+    The rows a profile can ever get (ignoring rank) are looked up once, in
+    close rank order, per institute type. The rows eligible at rank r are the
+    suffix with close rank >= r, so counts for any number of ranks are one
+    searchsorted call, and the list at a rank is a slice.
+    """
+
+    def __init__(self, table, candidates, institutes):
+        self.table = table
+        self.institutes = list(institutes)
+        institute_of_row = table.codes['institute'][candidates]
+        self.candidates = {
+            institute: candidates[institute_of_row == table.code('institute', institute)]
+            for institute in self.institutes
+        }
+        self.close_rank = {institute: table.close_rank[rows] for institute, rows in self.candidates.items()}
+
+    def counts(self, ranks):
+        """DataFrame with a 'rank' column and the number of eligible programs per institute type at each rank"""
+        ranks = np.asarray(ranks, dtype=float)
+        counts = {'rank': ranks}
+        for institute in self.institutes:
+            close_rank = self.close_rank[institute]
+            counts[institute] = len(close_rank) - np.searchsorted(close_rank, ranks, side='left')
+        return pd.DataFrame(counts)
+
+    def at(self, rank, limit=None, offset=0):
+        """{institute type: results} at one rank, as recommend() returns them (including `limit`/`offset` paging)"""
+        results = {}
+        for institute, rows in self.candidates.items():
+            start = np.searchsorted(self.close_rank[institute], float(rank), side='left')
+            eligible = rows[start:]
+            page = self.table.rows(eligible[offset:] if limit is None else eligible[offset:offset + limit])
+            page.attrs['total'] = len(eligible)
+            results[institute] = page
+        return results
+
+def rank_sweep(table, gender, category, degrees, branches, state=None, institutes=('NIT', 'IIIT'), catalog=None):
+    """RankSweep of a profile over a combined table, for "what if my rank were ..." questions"""
+    searched = _possible_institutes(catalog, gender, category, degrees, branches, institutes)
+    if not searched:
+        candidates = np.array([], dtype=np.int32)
     else:
-        # Sort by close rank (ascending) - lowest closing rank first (easiest to get)
-        df_filtered = df_filtered.sort_values(by='close rank', ascending=True)
-    
-    return df_filtered[['college name', 'close rank']].reset_index(drop=True)
\ No newline at end of file
+        candidates = eligible_positions(table, gender, category, -np.inf, degrees, branches, state=state, debug=False, institutes=searched)
+    return RankSweep(table, candidates, institutes)
+
+class QueryCache:
+    """Bounded LRU memo of RankSweeps, keyed on the normalized profile without its rank.
+
+    Students sharing gender, category, home state, degrees, branches and
+    institute types share one entry whatever their rank: answering a rank
+    from it is a binary search and a slice. Keys include the table's token,
+    so a refreshed snapshot never serves old results; clear() drops them.
+    """
+
+    def __init__(self, maxsize=QUERY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(table, gender, category, degrees, branches, state, institutes):
+        state = state[0] if isinstance(state, list) else state
+        return (
+            table.token,
+            tuple(institutes),
+            normalize(gender),
+            normalize(category),
+            normalize(state) if state else '',
+            frozenset(map(canonical_key, degrees)),
+            frozenset(map(canonical_key, branches)),
+        )
+
+    def sweep(self, table, gender, category, degrees, branches, state=None, institutes=('NIT', 'IIIT'), catalog=None):
+        """rank_sweep() of a profile, computed once per normalized profile and table"""
+        key = self.key(table, gender, category, degrees, branches, state, institutes)
+        with self._lock:
+            sweep = self.entries.get(key)
+            if sweep is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return sweep
+            self.misses += 1
+
+        sweep = rank_sweep(table, gender, category, degrees, branches, state=state, institutes=institutes, catalog=catalog)
+        with self._lock:
+            self.entries[key] = sweep
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return sweep
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
+
+# Shared by every session in the process; data_loader clears it when the snapshot changes
+query_cache = QueryCache()
+
+def split_choices(value):
+    """Degrees/branches given as a list or as a ', '-joined string (as saved in user data)"""
+    if isinstance(value, str):
+        return [choice.strip() for choice in value.split(', ') if choice.strip()]
+    return list(value)
+
+def recommend_batch(profiles, nits, iiits):
+    """Recommend NITs and IIITs for many profiles at once.
+
+    `profiles` is a DataFrame with columns gender, category, state, rank,
+    degrees and branches (lists or ', '-joined strings). Profiles sharing
+    everything but the rank are evaluated together: their candidate rows
+    are looked up once, and each rank only needs a binary search into them.
+
+    Returns one row per (profile, college) with columns 'profile' (the
+    index label of the profile), 'institute', 'college name' and 'close rank',
+    in profile order, then by institute and close rank.
+    """
+    institutes = [("NIT", nits, True), ("IIIT", iiits, False)]
+    matches = {institute: ([], []) for institute, _, _ in institutes}
+
+    keys = pd.DataFrame({
+        'gender': profiles['gender'].map(normalize),
+        'category': profiles['category'].map(normalize),
+        'state': profiles['state'].map(normalize),
+        'degrees': profiles['degrees'].map(lambda v: tuple(sorted(set(map(canonical_key, split_choices(v)))))),
+        'branches': profiles['branches'].map(lambda v: tuple(sorted(set(map(canonical_key, split_choices(v)))))),
+    })
+    keys.index = np.arange(len(profiles))
+    ranks = pd.to_numeric(profiles['rank'], errors='coerce').to_numpy(dtype=float)
+
+    for (gender, category, state, degrees, branches), group in keys.groupby(list(keys.columns), sort=False):
+        members = group.index.to_numpy()
+
+        for institute, table, is_nit in institutes:
+            # All rows this group could ever get, in close rank order
+            candidates = eligible_positions(table, gender, category, -np.inf, degrees, branches, state=state, is_nit=is_nit, debug=False)
+            if len(candidates) == 0:
+                continue
+            starts = np.searchsorted(table.close_rank[candidates], ranks[members], side='left')
+
+            members_out, positions_out = matches[institute]
+            for member, rank, start in zip(members, ranks[members], starts):
+                if np.isnan(rank) or start == len(candidates):
+                    continue
+                members_out.append(np.full(len(candidates) - start, member))
+                positions_out.append(candidates[start:])
+
+    results = []
+    for institute, table, _ in institutes:
+        members_out, positions_out = matches[institute]
+        if not members_out:
+            continue
+        members_out = np.concatenate(members_out)
+        rows = table.rows(np.concatenate(positions_out))
+        rows.insert(0, 'institute', institute)
+        rows.insert(0, 'profile', profiles.index[members_out])
+        rows['_order'] = members_out
+        results.append(rows)
+
+    if not results:
+        return pd.DataFrame(columns=['profile', 'institute'] + OUTPUT_COLUMNS)
+    results = pd.concat(results, ignore_index=True).sort_values(['_order', 'institute', 'close rank'], kind='stable')
+    return results.drop(columns='_order').reset_index(drop=True)
@@ -0,0 +1,281 @@
+import argparse
+import gzip
+import json
+import os
+import signal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import metrics
+from data_loader import get_refresh_schedule, load_catalogs, load_dataset, start_refresh_scheduler, use_refresh_schedule
+from options import exam_institutes
+from recommender import complete_rounds, latest_round, normalize, normalizer, query_cache, recommend
+
+# Headless JSON API over the recommender, for bots and partner sites.
+#
+#   GET  /health                  rounds available in the loaded dataset
+#   GET  /options?exam=&round=    selectable options with availability counts
+#   POST /recommend               {"exam", "gender", "category", "state", "rank",
+#                                  "degrees", "branches", "round", "limit", "offset"}
+#                                 ("state" is required for JEE Mains, whose NITs have home-state quotas)
+#   GET  /metrics                 per-stage timings of the worker that answers
+#
+# The dataset comes from the local snapshot like the apps (see data_loader);
+# set SHEETS_FAKE_DIR=<dir of CSVs> to serve files instead of Google Sheets.
+# The listening socket is opened once and shared by `workers` forked
+# processes, each running a threaded server. The parent refreshes the
+# snapshot on the JoSAA schedule (see josaa_schedule.py) and the workers
+# pick up its snapshots.
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+MAX_BODY_BYTES = 64 * 1024
+# Responses smaller than this aren't worth compressing
+GZIP_MIN_BYTES = 1024
+
+class BadRequest(Exception):
+    pass
+
+def _catalog(round_no, institutes):
+    catalogs = load_catalogs()
+    if not catalogs:
+        raise BadRequest("No data loaded")
+    if round_no is None:
+        # The latest round with sheets for every institute type of the exam
+        try:
+            round_no = latest_round(load_dataset(), institutes)
+        except ValueError as e:
+            raise BadRequest(str(e))
+        return round_no, catalogs[round_no]
+    try:
+        round_no = int(round_no)
+    except (TypeError, ValueError):
+        raise BadRequest("'round' must be a round number")
+    # Only rounds with sheets for every institute type of the exam
+    available = [r for r in complete_rounds(load_dataset(), institutes) if r in catalogs]
+    if round_no not in available:
+        raise BadRequest(f"Unknown round {round_no}; available: {available}")
+    return round_no, catalogs[round_no]
+
+def _choice(catalog, column, value, field):
+    """`value` if it is one of the column's options in the data, else BadRequest"""
+    if not isinstance(value, str) or normalizer(column)(value) not in catalog.keys[column]:
+        raise BadRequest(f"Unknown {field} {value!r}")
+    return value
+
+def _choices(catalog, column, values, field):
+    if isinstance(values, str):
+        values = [values]
+    if not isinstance(values, list) or not values:
+        raise BadRequest(f"'{field}' must be a non-empty list")
+    return [_choice(catalog, column, value, field[:-1]) for value in values]
+
+def _int(value, field, minimum, maximum=None):
+    """`value` as an int if it is a whole number (e.g. 5000, 5000.0 or "5000") within bounds, else BadRequest"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise BadRequest(f"'{field}' must be an integer")
+    try:
+        # 1.9 isn't a whole number, and 1e400 parses as inf
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError
+        number = int(value)
+    except (ValueError, OverflowError):
+        raise BadRequest(f"'{field}' must be an integer")
+    if number < minimum or (maximum is not None and number > maximum):
+        raise BadRequest(f"'{field}' must be between {minimum} and {maximum}" if maximum is not None else f"'{field}' must be at least {minimum}")
+    return number
+
+def validate(body):
+    """Checked recommend() arguments from a /recommend request body, or BadRequest"""
+    if not isinstance(body, dict):
+        raise BadRequest("Request body must be a JSON object")
+    missing = [field for field in ("exam", "gender", "category", "rank", "degrees", "branches") if field not in body]
+    if missing:
+        raise BadRequest(f"Missing fields: {', '.join(missing)}")
+    if body["exam"] not in exam_institutes:
+        raise BadRequest(f"'exam' must be one of {list(exam_institutes)}")
+
+    institutes = exam_institutes[body["exam"]]
+    round_no, catalog = _catalog(body.get("round"), institutes)
+    state = body.get("state")
+    # NIT seats depend on the home state (HS vs OS quota), so it can't be left out for them
+    if state is None and "NIT" in institutes:
+        raise BadRequest(f"'state' is required for {body['exam']}")
+    if state is not None and (not isinstance(state, str) or normalize(state) not in {normalize(s) for s in catalog.states}):
+        raise BadRequest(f"Unknown state {state!r}")
+    return {
+        "round_no": round_no,
+        "catalog": catalog,
+        "institutes": institutes,
+        "gender": _choice(catalog, 'gender', body["gender"], "gender"),
+        "category": _choice(catalog, 'category', body["category"], "category"),
+        "state": state,
+        "rank": _int(body["rank"], "rank", 1),
+        "degrees": _choices(catalog, 'degree', body["degrees"], "degrees"),
+        "branches": _choices(catalog, 'branch', body["branches"], "branches"),
+        "limit": _int(body.get("limit", DEFAULT_LIMIT), "limit", 1, MAX_LIMIT),
+        "offset": _int(body.get("offset", 0), "offset", 0),
+    }
+
+def recommend_json(query):
+    """Response body of a validated /recommend request"""
+    table = load_dataset()[f"all round {query['round_no']}"]
+    results = recommend(
+        table, query["gender"], query["category"], query["rank"], query["degrees"], query["branches"],
+        state=query["state"], institutes=query["institutes"], debug=False, catalog=query["catalog"],
+        limit=query["limit"], offset=query["offset"], cache=query_cache
+    )
+    return {
+        "round": query["round_no"],
+        "results": {
+            institute: {"total": rows.attrs['total'], "offset": query["offset"], "colleges": rows.to_dict('records')}
+            for institute, rows in results.items()
+        },
+    }
+
+def options_json(params):
+    exam = params.get("exam", ["JEE Mains"])[0]
+    if exam not in exam_institutes:
+        raise BadRequest(f"'exam' must be one of {list(exam_institutes)}")
+    institutes = exam_institutes[exam]
+    round_no, catalog = _catalog(params.get("round", [None])[0], institutes)
+    options = {"round": round_no, "states": catalog.states}
+    for field, column in [("genders", 'gender'), ("categories", 'category'), ("degrees", 'degree'), ("branches", 'branch')]:
+        options[field] = [{"label": label, "programs": count} for label, count in catalog.options(column, institutes=institutes)]
+    return options
+
+class RecommendationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path.rstrip('/')
+        if path == '/health':
+            self._handle("server.health", lambda: {"status": "ok", "rounds": sorted(load_catalogs())})
+        elif path == '/options':
+            self._handle("server.options", lambda: options_json(parse_qs(url.query)))
+        elif path == '/metrics':
+            self._send(200, metrics.snapshot())
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != '/recommend':
+            # The body is left unread, so it can't stay on a kept-alive connection
+            self.close_connection = True
+            self._send(404, {"error": "Not found"})
+            return
+        self._handle("server.recommend", lambda: recommend_json(validate(self._read_json())))
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        # A body that isn't read would be parsed as the next request, so drop the connection instead.
+        # (A negative length would make read() wait for the client to disconnect.)
+        if length < 0 or length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise BadRequest("Invalid Content-Length" if length < 0 else "Request body too large")
+        try:
+            return json.loads(self.rfile.read(length) or b'null')
+        except ValueError:
+            raise BadRequest("Request body must be valid JSON")
+
+    def _handle(self, stage, build):
+        metrics.incr(f"{stage}.requests")
+        try:
+            with metrics.timed(stage):
+                body = build()
+        except BadRequest as e:
+            metrics.incr(f"{stage}.rejected")
+            self._send(400, {"error": str(e)})
+            return
+        except Exception as e:
+            print(f"[DEBUG] {stage} failed: {e}")
+            self._send(500, {"error": "Internal error"})
+            return
+        self._send(200, body)
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        compress = len(data) >= GZIP_MIN_BYTES and 'gzip' in self.headers.get("Accept-Encoding", "")
+        if compress:
+            data = gzip.compress(data, compresslevel=5)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(data)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(host="127.0.0.1", port=8000, workers=1):
+    """Serve the API on host:port with `workers` processes (forked; a single process where fork is unavailable)"""
+    server = ThreadingHTTPServer((host, port), RecommendationHandler)
+    server.daemon_threads = True
+    # Load once before forking: workers start with the snapshot already mapped
+    # (shared pages), and an infinite TTL keeps refresh threads out of the fork
+    load_dataset(ttl=float('inf'))
+    schedule = get_refresh_schedule()
+    use_refresh_schedule(schedule)
+    print(f"Serving recommendations on http://{host}:{server.server_address[1]} with {workers} worker(s)")
+
+    if workers <= 1 or not hasattr(os, "fork"):
+        start_refresh_scheduler(schedule)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+    # Only after forking: threads don't survive a fork
+    start_refresh_scheduler(schedule)
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        stop(None, None)
+        for pid in children:
+            os.waitpid(pid, 0)
+    finally:
+        server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve college recommendations as a JSON HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: one per core)")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import argparse
+import glob
+import hashlib
+import os
+import re
+import sqlite3
+
+import pandas as pd
+
+# Local data sources for the round tables, interchangeable with the Google Sheet.
+#
+# Every source has fetch(known=None) -> (data, fingerprints), like
+# data_loader.fetch_sheets: cleaned DataFrames keyed by lowercased round
+# name ("nits round 5") for the tables that changed since the `known`
+# fingerprints, and the fingerprints of all round tables. DATA_SOURCE picks
+# the source (see parse_source):
+#
+#   DATA_SOURCE=sheets                  the Google Sheet (default)
+#   DATA_SOURCE=csv:<folder>            "<round>.csv" files, e.g. "NITs Round 5.csv"
+#   DATA_SOURCE=parquet:<folder>        "<round>.parquet" files (needs pyarrow)
+#   DATA_SOURCE=sqlite:<file>           one table per round, named like the worksheet
+#
+# `python sources.py export <spec>` copies the configured source into a local one.
+
+# Worksheets, files or tables holding a round's closing ranks, e.g. "NITs Round 5"
+ROUND_SHEET = re.compile(r'^(NITs|IIITs|IITs) Round (\d+)$', re.IGNORECASE)
+# Display titles of the lowercased round names, for exported files and tables
+TITLES = {'nits': 'NITs', 'iiits': 'IIITs', 'iits': 'IITs'}
+
+def clean_columns(columns):
+    return (
+        pd.Index(columns)
+        .str.encode('ascii', 'ignore').str.decode('ascii')
+        .str.strip()
+        .str.lower()
+        .str.replace(r'\s+', ' ', regex=True)
+    )
+
+def clean_frame(df):
+    """A round table in the cleaned schema every source produces.
+
+    Column names are ASCII, lowercased and single-spaced; cells are strings
+    ('' when missing) except 'close rank', which is numeric, and rows
+    without a close rank are dropped.
+    """
+    df = df.astype(object).where(df.notna(), '').astype(str)
+    df.columns = clean_columns(df.columns)
+    df['close rank'] = pd.to_numeric(df['close rank'], errors='coerce')
+    return df.dropna(subset=['close rank']).reset_index(drop=True)
+
+def values_hash(rows):
+    """Hash of a table's cell values, ignoring trailing empty cells and rows (which the Sheets API may leave out)"""
+    lines = []
+    for row in rows:
+        row = list(row)
+        while row and row[-1] == '':
+            row.pop()
+        lines.append("\x1f".join(str(value) for value in row))
+    while lines and lines[-1] == '':
+        lines.pop()
+    return hashlib.sha1("\x1e".join(lines).encode('utf-8')).hexdigest()
+
+def title(name):
+    """Worksheet-style title of a round name, e.g. 'nits round 5' -> 'NITs Round 5'"""
+    institute, _, round_no = name.split(' ')
+    return f"{TITLES.get(institute, institute)} Round {round_no}"
+
+class FileSource:
+    """Round tables from '<round>.csv' or '<round>.parquet' files in a folder.
+
+    A file's fingerprint is its modification time and size, so only files
+    that were rewritten are read again.
+    """
+
+    def __init__(self, folder, format='csv'):
+        self.folder = folder
+        self.format = format
+
+    def __repr__(self):
+        return f"{self.format}:{self.folder}"
+
+    def _files(self):
+        files = {}
+        for path in sorted(glob.glob(os.path.join(self.folder, f"*.{self.format}"))):
+            stem = os.path.splitext(os.path.basename(path))[0].strip()
+            if ROUND_SHEET.match(stem):
+                files[stem.lower()] = path
+        return files
+
+    def _read(self, path):
+        if self.format == 'parquet':
+            return pd.read_parquet(path)
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+    def fetch(self, known=None):
+        known = known or {}
+        data = {}
+        fingerprints = {}
+        for name, path in self._files().items():
+            stat = os.stat(path)
+            fingerprints[name] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+            if known.get(name) != fingerprints[name]:
+                data[name] = clean_frame(self._read(path))
+        return data, fingerprints
+
+    def write(self, data):
+        os.makedirs(self.folder, exist_ok=True)
+        for name, df in data.items():
+            path = os.path.join(self.folder, f"{title(name)}.{self.format}")
+            if self.format == 'parquet':
+                df.to_parquet(path, index=False)
+            else:
+                df.to_csv(path, index=False)
+
+class SQLiteSource:
+    """Round tables from a SQLite database, one table per round named like its worksheet.
+
+    A table's fingerprint is its row count and a hash of its column names
+    and rows in rowid order, so in-place updates are picked up too.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __repr__(self):
+        return f"sqlite:{self.path}"
+
+    def _connect(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"SQLite data source not found: {self.path}")
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def fetch(self, known=None):
+        known = known or {}
+        data = {}
+        fingerprints = {}
+        with self._connect() as connection:
+            tables = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            for table in tables:
+                if not ROUND_SHEET.match(table.strip()):
+                    continue
+                name = table.strip().lower()
+                cursor = connection.execute(f'SELECT * FROM "{table}" ORDER BY rowid')
+                columns = [column[0] for column in cursor.description]
+                rows = cursor.fetchall()
+                fingerprints[name] = {"rows": len(rows), "hash": values_hash([columns] + rows)}
+                if known.get(name) != fingerprints[name]:
+                    data[name] = clean_frame(pd.DataFrame(rows, columns=columns))
+        return data, fingerprints
+
+    def write(self, data):
+        with sqlite3.connect(self.path) as connection:
+            for name, df in data.items():
+                df.to_sql(title(name), connection, if_exists='replace', index=False)
+
+def parse_source(spec):
+    """The local source a DATA_SOURCE value names, or None for the Google Sheet"""
+    kind, _, location = (spec or 'sheets').partition(':')
+    kind = kind.strip().lower()
+    if kind == 'sheets':
+        return None
+    if not location:
+        raise ValueError(f"DATA_SOURCE '{spec}' needs a location, e.g. {kind}:<path>")
+    if kind in ('csv', 'parquet'):
+        return FileSource(location, kind)
+    if kind == 'sqlite':
+        return SQLiteSource(location)
+    raise ValueError(f"Unknown DATA_SOURCE '{spec}' (expected sheets, csv:<folder>, parquet:<folder> or sqlite:<file>)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy the round tables from the configured DATA_SOURCE into a local source.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Write every round table to csv:<folder>, parquet:<folder> or sqlite:<file>")
+    export.add_argument("target")
+    args = parser.parse_args()
+
+    from data_loader import get_data_source
+
+    target = parse_source(args.target)
+    if target is None:
+        parser.error("the Google Sheet can't be an export target")
+    data, _ = get_data_source().fetch()
+    target.write(data)
+    for name, df in data.items():
+        print(f"✅ {title(name)}: {len(df)} rows")
+    print(f"Exported to {target!r}")
+
+if __name__ == "__main__":
+    main()
@@ -1,136 +1,37 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-from data_loader import load_sheets, save_user_chat_json
-from recommender import filter_colleges
+from data_loader import load_catalogs, load_dataset, save_user_chat_json, start_refresh_scheduler
+from recommender import complete_rounds, query_cache, recommend
+from catalog import with_count
+from chat_log import chat_store_path
+# Hardcoded selections, used only when the data can't be loaded
+from options import gender_options, category_options, state_options, degree_options, branch_options
+from options import exam_institutes
+import metrics
+
+# Result rows shown per page and institute type
+PAGE_SIZE = 25
+
+# Exposes per-stage timings when METRICS_PORT / METRICS_DUMP_FILE are set
+metrics.start_exporters()
 
 st.title("🎓 JEE College Recommendation Bot")
 
 # Introduction
-st.markdown("""
+st.markdown(f"""
 ### Hello! I can recommend colleges based on your JEE rank.
 
-**Currently supported:** JEE Mains based recommendations
-**Coming soon:** JEE Advanced based recommendations
+**Currently supported:** JEE Mains (NITs & IIITs) and JEE Advanced (IITs) based recommendations
 
 **New Features:**
 - ✅ Shows only colleges where Close Rank ≥ Your Rank (you can get admission)
 - ✅ College State filter for NITs (Home State: HS quota only, Other State: OS quota only)
 - ✅ Results sorted by close rank in ascending order (easiest to get first)
-- ✅ Complete chat history saved as JSON in local folder
+- ✅ Complete chat history saved locally in `{chat_store_path()}`
 - ✅ No Google Sheets storage - everything saved locally
 """)
 
-# --- Hardcoded Selections ---
-gender_options = ["Gender-Neutral", "Female-only (including Supernumerary)"]
-category_options = ["SC", "ST", "EWS", "EWS (PwD)", "OBC-NCL", "OBC-NCL (PwD)", "OPEN", "OPEN (PwD)", "SC (PwD)", "ST (PwD)"]
-state_options = ["Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh", "Delhi", "Goa", "Gujarat", "Haryana", "Himachal Pradesh", "Jammu and Kashmir", "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh", "Manipur", "Meghalaya", "Mizoram", "Maharashtra", "Nagaland", "Odisha", "Puducherry", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana", "Tripura", "Uttar Pradesh", "Uttarakhand", "West Bengal"]
-
-degree_options = [
-    "Bachelor of Technology",
-    "Bachelor and Master of Technology (Dual Degree)",
-    "Integrated Master of Science",
-    "Integrated B. Tech. and M. Tech",
-    "Bachelor of Architecture",
-    "Bachelor of Planning",
-    "Bachelor of Science and Master of Science (Dual Degree)",
-    "B.Tech. + M.Tech./MS (Dual Degree)",
-]
-
-branch_options = [
-    "Artificial Intelligence",
-    "Aerospace Engineering",
-    "Architecture",
-    "Architecture and Planning",
-    "Artificial Intelligence and Data Engineering",
-    "Artificial Intelligence and Data Science",
-    "Artificial Intelligence and Machine Learning",
-    "B.Tech in Mathematics and Computing",
-    "B.Tech in Mechanical Engineering and M.Tech in AI and Robotics",
-    "B.Tech. in Electronics and Communication Engineering and M.Tech. in Communication Systems",
-    "B.Tech. in Electronics and Communication Engineering and M.Tech. in VLSI Design",
-    "Bio Medical Engineering",
-    "Bio Technology",
-    "Biotechnology",
-    "Biotechnology and Biochemical Engineering",
-    "Civil Engineering",
-    "Ceramic Engineering",
-    "Ceramic Engineering and M.Tech Industrial Ceramic",
-    "Chemical Engineering",
-    "Chemical Technology",
-    "Chemistry",
-    "Civil Engineering with Specialization in Construction Technology and Management",
-    "Computational and Data Science",
-    "Computational Mathematics",
-    "Computer Science",
-    "Computer Science and Artificial Intelligence",
-    "Computer Science and Business",
-    "Computer Science and Engineering",
-    "Computer Science and Engineering (Artificial Intelligence)",
-    "Computer Science Engineering (Artificial lntelligence and Machine Learning)",
-    "Computer Science Engineering (Data Science and Analytics)",
-    "Computer Science and Engineering (Cyber Physical System)",
-    "Computer Science and Engineering (Cyber Security)",
-    "Computer Science and Engineering (Data Science)",
-    "Computer Science and Engineering (with Specialization of Data Science and Artificial Intelligence)",
-    "Computer Science Engineering (Human Computer lnteraction and Gaming Technology)",
-    "CSE ( Data Science & Analytics)",
-    "Data Science and Engineering",
-    "Data Science and Artificial Intelligence",
-    "Electronics and Communication Engineering",
-    "Electrical and Electronics Engineering",
-    "Electrical Engineering",
-    "Electrical Engineering with Specialization In Power System Engineering",
-    "Electronics and Communication Engineering (Internet of Things)",
-    "Electronics and Communication Engineering (with Specialization of Embedded Systems and Internet of Things)",
-    "Electronics and Communication Engineering with specialization in Design and Manufacturing",
-    "Electronics and Communication Engineering (VLSI Design and Technology)",
-    "Electronics and Communication Engineering with Specialization in Microelectronics and VLSI System Design",
-    "Electronics and Communication Engineering with specialization in VLSI and Embedded Systems",
-    "Electronics and Instrumentation Engineering",
-    "Electronics and Telecommunication Engineering",
-    "Electronics and VLSI Engineering",
-    "Engineering and Computational Mechanics",
-    "Engineering Physics",
-    "Food Process Engineering",
-    "Industrial and Production Engineering",
-    "Information Technology-Business Informatics",
-    "Integrated B. Tech.(IT) and M. Tech (IT)",
-    "Integrated B. Tech.(IT) and MBA",
-    "Industrial Chemistry",
-    "Industrial Design",
-    "Industrial Internet of Things",
-    "Information Technology",
-    "Instrumentation and Control Engineering",
-    "Life Science",
-    "Material Science and Engineering",
-    "Materials Engineering",
-    "Materials Science and Engineering",
-    "Materials Science and Metallurgical Engineering",
-    "Mathematics",
-    "Mathematics & Computing",
-    "Mathematics and Computing",
-    "Mathematics and Computing Technology",
-    "Mathematics and Scientific Computing",
-    "Mathematics and Data Science",
-    "Mechanical Engineering",
-    "Mechanical Engineering with Specialization in Manufacturing and Industrial Engineering",
-    "Mechanical Engineering with specialization in Design and Manufacturing",
-    "Mechatronics and Automation Engineering",
-    "Metallurgical and Materials Engineering",
-    "Metallurgy and Materials Engineering",
-    "Microelectronics & VLSI Engineering",
-    "Mining Engineering",
-    "Physics",
-    "Planning",
-    "Production and Industrial Engineering",
-    "Production Engineering",
-    "ROBOTICS & AUTOMATION",
-    "SUSTAINABLE ENERGY TECHNOLOGIES",
-    "Smart Manufacturing",
-    "Textile Technology",
-    "VLSI Design and Technology"
-]
-
 # --- UI Inputs ---
 st.sidebar.header("Personal Information")
 name = st.sidebar.text_input("Enter your Name")
@@ -138,24 +39,59 @@ phone = st.sidebar.text_input("Enter your Phone Number")
 
 st.sidebar.header("Your Preferences")
 
-gender = st.sidebar.selectbox("Select your Gender", gender_options)
-category = st.sidebar.selectbox("Select your Category", category_options)
-state = st.sidebar.selectbox("Select your Home State", state_options)
-
-degrees = st.sidebar.multiselect("Select Preferred Degree(s)", degree_options)
-branches = st.sidebar.multiselect("Select Preferred Branch(es)", branch_options)
-
-rank = st.sidebar.number_input("Enter your JEE Mains Rank", min_value=1, value=10000)
+exam = st.sidebar.radio("Which exam would you like suggestions for?", ["JEE Mains", "JEE Advanced"])
+# JEE Mains ranks are used for NITs and IIITs, JEE Advanced ranks for IITs
+institutes = exam_institutes[exam]
+
+# Refresh the data right after each JoSAA round is published (once per process; see josaa_schedule.py)
+start_refresh_scheduler()
+
+# Options and their availability come from the loaded data, rebuilt once per refresh
+try:
+    catalogs = load_catalogs()
+except Exception:
+    catalogs = {}
+
+# JoSAA round whose closing ranks to use: rounds with sheets for every institute type of the exam, latest first
+try:
+    rounds = [r for r in complete_rounds(load_dataset(), institutes) if r in catalogs][::-1]
+except Exception:
+    rounds = []
+round_no = st.sidebar.selectbox("JoSAA Round", rounds or [5], format_func=lambda r: f"Round {r}")
+catalog = catalogs.get(round_no)
+
+def choices(column, fallback, **selected):
+    """{option: number of programs} within the current selections, or the hardcoded options with unknown counts"""
+    if catalog is None:
+        return dict.fromkeys(fallback)
+    return dict(catalog.options(column, institutes=institutes, **selected))
+
+genders = choices('gender', gender_options)
+gender = st.sidebar.selectbox("Select your Gender", list(genders), format_func=lambda g: with_count(g, genders[g]))
+categories = choices('category', category_options, gender=gender)
+category = st.sidebar.selectbox("Select your Category", list(categories), format_func=lambda c: with_count(c, categories[c]))
+state = st.sidebar.selectbox("Select your Home State", catalog.states if catalog else state_options)
+
+# Counted within gender and category only: labels that changed with every pick would reset the multiselects
+degree_counts = choices('degree', degree_options, gender=gender, category=category)
+degrees = st.sidebar.multiselect("Select Preferred Degree(s)", list(degree_counts), format_func=lambda d: with_count(d, degree_counts[d]))
+branch_counts = choices('branch', branch_options, gender=gender, category=category)
+branches = st.sidebar.multiselect("Select Preferred Branch(es)", list(branch_counts), format_func=lambda b: with_count(b, branch_counts[b]))
+
+if catalog is not None and degrees and branches:
+    st.sidebar.caption(f"{catalog.count(gender, category, degrees, branches, institutes)} programs offered for this selection (before rank and quota)")
+
+rank = st.sidebar.number_input(f"Enter your {exam} Rank", min_value=1, value=10000)
 
 # Add info about the filtering logic
 st.sidebar.markdown("---")
-st.sidebar.info("""
+st.sidebar.info(f"""
 **Updated Filtering Logic:**
 - ✅ Shows only colleges where Close Rank ≥ Your Rank
 - ✅ Home State colleges: Only HS quota seats
 - ✅ Other State colleges: Only OS quota seats
 - ✅ Results sorted by close rank (easiest first)
-- ✅ Data saved locally as JSON files
+- ✅ Data saved locally in `{chat_store_path()}`
 """)
 
 if st.sidebar.button("🔍 Get Recommendations"):
@@ -164,83 +100,100 @@ if st.sidebar.button("🔍 Get Recommendations"):
     elif not degrees or not branches:
         st.error("❌ Please select at least one Degree and one Branch.")
     else:
-        with st.spinner("📥 Loading and filtering colleges..."):
+        metrics.incr("stream.requests")
+        with st.spinner("📥 Loading and filtering colleges..."), metrics.timed("stream.request"):
             try:
-                sheets = load_sheets()
+                # Shared by every session in this server process - only the result frames are per session
+                with metrics.timed("stream.load_dataset"):
+                    sheets = load_dataset()
+                    catalog = load_catalogs().get(round_no)
                 
-                # --- NITs with College State & Quota filtering ---
-                nits_df = filter_colleges(
-                    sheets["nits round 5"],
-                    gender,
-                    category,
-                    rank,
-                    degrees,
-                    branches,
-                    state=state,
-                    is_nit=True
-                )
-
-                # --- IIITs without state sorting (same logic as NITs but no state filter) ---
-                iiits_df = filter_colleges(
-                    sheets["iiits round 5"],
-                    gender,
-                    category,
-                    rank,
-                    degrees,
-                    branches,
-                    state=None,  # No state filtering for IIITs
-                    is_nit=False
-                )
+                # --- NITs (with College State & Quota filtering), IIITs and IITs in one pass ---
+                with metrics.timed("stream.filter"):
+                    results = recommend(
+                        sheets[f"all round {round_no}"],
+                        gender,
+                        category,
+                        rank,
+                        degrees,
+                        branches,
+                        state=state,
+                        institutes=institutes,
+                        catalog=catalog,
+                        cache=query_cache
+                    )
 
                 st.success("✅ Recommendations generated successfully!")
-                
-                # Display results
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.subheader("🟢 NITs")
-                    if nits_df.empty:
-                        st.warning("No NITs found where you can get admission with your current rank.")
-                    else:
-                        # Display without index
-                        st.dataframe(nits_df, use_container_width=True, hide_index=True)
-                        st.info(f"Found {len(nits_df)} NIT options where you can get admission")
 
-                with col2:
-                    st.subheader("🟣 IIITs")
-                    if iiits_df.empty:
-                        st.warning("No IIITs found where you can get admission with your current rank.")
-                    else:
-                        # Display without index
-                        st.dataframe(iiits_df, use_container_width=True, hide_index=True)
-                        st.info(f"Found {len(iiits_df)} IIIT options where you can get admission")
+                # Remember the query: paging through results reruns the script without the button
+                st.session_state["query"] = dict(round_no=round_no, gender=gender, category=category, rank=rank, degrees=degrees, branches=branches, state=state, institutes=institutes)
+                for institute in institutes:
+                    st.session_state.pop(f"page {institute}", None)
 
                 # Prepare user data
                 user_data = {
                     'name': name,
                     'phone': phone,
+                    'exam': exam,
                     'gender': gender,
                     'category': category,
                     'state': state,
                     'degrees': ', '.join(degrees),
                     'branches': ', '.join(branches),
                     'rank': rank,
-                    'nit_count': len(nits_df),
-                    'iiit_count': len(iiits_df)
+                    'nit_count': len(results.get("NIT", [])),
+                    'iiit_count': len(results.get("IIIT", [])),
+                    'iit_count': len(results.get("IIT", []))
                 }
                 
-                # Save complete chat as JSON (removed Google Sheets)
+                # Save the complete chat to the local chat store (removed Google Sheets)
                 try:
-                    json_filename = save_user_chat_json(user_data, nits_df, iiits_df)
-                    st.success(f"✅ Complete chat saved as: {json_filename}")
+                    with metrics.timed("stream.save_chat"):
+                        saved_to = save_user_chat_json(user_data, results.get("NIT"), results.get("IIIT"), results.get("IIT"))
+                    st.success(f"✅ Complete chat saved to: {saved_to}")
                 except Exception as e:
-                    st.warning(f"⚠️ Could not save chat JSON: {e}")
-                
+                    st.warning(f"⚠️ Could not save chat: {e}")
                 
-                
-                        
             except Exception as e:
                 st.error(f"❌ Error occurred: {str(e)}")
                 st.error("Please check your Google Sheets connection and data.")
 
+# Results of the last query, one page per institute type: only the rows on screen are materialized and sent
+if "query" in st.session_state:
+    query = st.session_state["query"]
+    try:
+        sheets = load_dataset()
+        catalog = load_catalogs().get(query["round_no"])
+        table = sheets[f"all round {query['round_no']}"]
+        # Every page and the what-if chart come from the profile's memoized matches (see recommender.QueryCache)
+        sweep = query_cache.sweep(table, query["gender"], query["category"], query["degrees"], query["branches"], state=query["state"], institutes=query["institutes"], catalog=catalog)
+        headings = {"NIT": "🟢 NITs", "IIIT": "🟣 IIITs", "IIT": "🔵 IITs"}
+        with metrics.timed("stream.render"):
+            for column, institute in zip(st.columns(len(query["institutes"])), query["institutes"]):
+                with column:
+                    st.subheader(headings[institute])
+                    page = st.session_state.get(f"page {institute}", 1)
+                    results = sweep.at(query["rank"], limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE)[institute]
+                    total = results.attrs['total']
+                    if total == 0:
+                        st.warning(f"No {institute}s found where you can get admission with your current rank.")
+                    else:
+                        # Display without index
+                        st.dataframe(results, use_container_width=True, hide_index=True)
+                        pages = -(-total // PAGE_SIZE)
+                        if pages > 1:
+                            st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key=f"page {institute}")
+                        st.info(f"Found {total} {institute} options where you can get admission")
+
+        # What-if: number of options across nearby ranks, from the same lookup
+        with metrics.timed("stream.rank_sweep"):
+            spread = max(5000, query["rank"])
+            sweep_ranks = np.unique(np.linspace(max(1, query["rank"] - spread), query["rank"] + spread, 101).round())
+            counts = sweep.counts(sweep_ranks).rename(columns={'rank': 'Rank'}).set_index('Rank')
+        st.subheader("📈 What if your rank were different?")
+        st.line_chart(counts)
+        st.caption(f"Your rank: {query['rank']}. Better ranks are to the left.")
+    except Exception as e:
+        st.error(f"❌ Error occurred: {str(e)}")
+
 # Add explanation sectio
\ No newline at end of file
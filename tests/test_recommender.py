@@ -0,0 +1,94 @@
+"""The vectorized NIT home-state quota rule against the original row-wise one.
+
+reference_filter is filter_colleges as it was before the rule was
+vectorized (with its debug prints removed): a boolean filter followed by
+should_include_college applied row by row. Run from the repository root:
+
+    python -m pytest -q tests
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import BRANCHES, DEGREES, synthetic_table
+from recommender import PreparedTable, filter_colleges
+
+def reference_filter(df, gender, category, rank, degrees, branches, state=None, is_nit=False):
+    df = df.copy()
+    df['close rank'] = pd.to_numeric(df['close rank'], errors='coerce')
+    df = df.dropna(subset=['close rank'])
+
+    filters = (
+        (df['gender'].str.lower().str.strip() == gender.lower().strip()) &
+        (df['category'].str.lower().str.strip() == category.lower().strip()) &
+        (df['close rank'] >= float(rank)) &
+        (df['degree'].isin(degrees)) &
+        (df['branch'].isin(branches))
+    )
+    df_filtered = df[filters].copy()
+    if df_filtered.empty:
+        return df_filtered[['college name', 'close rank']]
+
+    if is_nit and state:
+        def should_include_college(row):
+            college_state = str(row.get('college state', '')).lower().strip()
+            user_state = state[0].lower().strip() if isinstance(state, list) else str(state).lower().strip()
+            quota = str(row.get('quota', '')).upper().strip()
+            if college_state == user_state:
+                # Same state: Only HS quota
+                return quota == 'HS'
+            # Different state: Only OS quota
+            return quota == 'OS'
+
+        df_filtered = df_filtered[df_filtered.apply(should_include_college, axis=1)].copy()
+        if df_filtered.empty:
+            return df_filtered[['college name', 'close rank']]
+
+    df_filtered = df_filtered.sort_values(by='close rank', ascending=True)
+    return df_filtered[['college name', 'close rank']].reset_index(drop=True)
+
+@pytest.fixture(scope="module")
+def nits():
+    """Synthetic NIT sheet with quota and state spellings the rule has to normalize"""
+    df = synthetic_table("nits", seed=7)
+    rng = np.random.default_rng(7)
+    rows = rng.choice(len(df), size=len(df) // 10, replace=False)
+    variants = {'HS': [' hs', 'Hs '], 'OS': ['os', ' OS '], 'AI': ['AI'], 'GO': ['GO']}
+    for row in rows:
+        quota = df.at[row, 'quota'] if rng.random() < 0.8 else rng.choice(['AI', 'GO'])
+        df.at[row, 'quota'] = rng.choice(variants[quota])
+        if rng.random() < 0.5:
+            df.at[row, 'college state'] = f" {df.at[row, 'college state'].upper()} "
+    return df
+
+@pytest.fixture(scope="module")
+def prepared(nits):
+    return PreparedTable(nits)
+
+def rows(df):
+    """Output rows as (college name, close rank) tuples, ordered by rank then name (ties may come in either order)"""
+    return sorted(zip(df['college name'], df['close rank'].astype(float)), key=lambda row: (row[1], row[0]))
+
+STATES = [None, "", "Bihar", " west bengal ", "GOA", "Lakshadweep", ["Kerala"]]
+RANKS = [1, 2500, 12000, 40000]
+SELECTIONS = [
+    ("Gender-Neutral", "OPEN", DEGREES[:1], BRANCHES[:3]),
+    ("Female-only (including Supernumerary)", "OBC-NCL", DEGREES, BRANCHES),
+    ("Gender-Neutral", "SC (PwD)", DEGREES[:2], BRANCHES[5:12]),
+]
+
+@pytest.mark.parametrize("state, rank, is_nit", list(itertools.product(STATES, RANKS, [True, False])))
+def test_quota_rule_matches_row_wise_reference(nits, prepared, state, rank, is_nit):
+    for gender, category, degrees, branches in SELECTIONS:
+        expected = reference_filter(nits, gender, category, rank, degrees, branches, state=state, is_nit=is_nit)
+        result = filter_colleges(prepared, gender, category, rank, degrees, branches, state=state, is_nit=is_nit, debug=False)
+
+        assert rows(result) == rows(expected)
+        assert list(result['close rank']) == sorted(result['close rank'])
+
+def test_raw_dataframe_matches_prepared_table(nits, prepared):
+    args = ("Gender-Neutral", "OPEN", 3000, DEGREES, BRANCHES)
+    raw = filter_colleges(nits, *args, state="Bihar", is_nit=True, debug=False)
+    assert rows(raw) == rows(filter_colleges(prepared, *args, state="Bihar", is_nit=True, debug=False))